@@ -1,11 +1,55 @@
+import io
+from typing import TextIO
+
+from jaclang.error.option_error import JaclangOptionError
+from jaclang.error.syntax_error import ErrorCollector
 from jaclang.generator import generate
+from jaclang.generator.peephole import PeepholeOptimizer
+from jaclang.ir import IrOptimizer
 from jaclang.lexer import tokenize
 from jaclang.parser import parse
+from jaclang.parser.function.inliner import DEFAULT_INLINE_BUDGET
+from jaclang.parser.root import RemovedFunctions
 from jaclang.preprocessor import preprocess
 
 
-def compileJaclang(file_contents: str, options: list[str]) -> str:
+# value of an option given as name=value, default if it is not given, it has to be a non-negative integer
+def get_option_value(options: list[str], name: str, default: int) -> int:
+    for option in options:
+        if option.startswith(name + "="):
+            value = option[len(name) + 1:]
+            if not value.isdecimal():
+                raise JaclangOptionError(f"Option {name} has to be a non-negative integer, got '{value}'")
+            return int(value)
+    return default
+
+
+# streams the assembly into output and returns the number of lines written
+# all errors found are raised together at the end, output is incomplete then
+def compileJaclangInto(file_contents: str, output: TextIO, options: list[str]) -> int:
+    # options are checked before anything is compiled
+    inline_budget = None if "no_inline" in options else get_option_value(options, "inline_budget",
+                                                                         DEFAULT_INLINE_BUDGET)
+    errors = ErrorCollector()
     preprocessed_contents = preprocess(file_contents, "debug_preprocess" in options)
     tokens = tokenize(preprocessed_contents, "debug_tokens" in options)
-    instructions = parse(tokens, "debug_tree" in options)
-    return generate(instructions, "debug_assembly" in options)
+    removed_functions = RemovedFunctions()
+    instructions = parse(tokens, "debug_tree" in options, "packrat" in options, "debug_packrat" in options, errors,
+                         inline_budget, removed_functions)
+    ir_optimizer = IrOptimizer("debug_cfg" in options, "debug_dataflow" in options)
+    instructions = ir_optimizer.optimize(instructions)
+    peephole_optimizer = PeepholeOptimizer()
+    instructions = peephole_optimizer.optimize(instructions)
+    num_lines = generate(instructions, output, "debug_assembly" in options)
+    errors.raiseErrors()
+    if "debug_ir" in options:
+        ir_optimizer.printStats(removed_functions.functions, removed_functions.instructions)
+    if "debug_peephole" in options:
+        peephole_optimizer.printStats()
+    return num_lines
+
+
+def compileJaclang(file_contents: str, options: list[str]) -> str:
+    output = io.StringIO()
+    compileJaclangInto(file_contents, output, options)
+    return output.getvalue()
@@ -1,6 +1,8 @@
+import os
 import sys
 
-from jaclang import compileJaclang
+from jaclang import compileJaclangInto
+from jaclang.error.option_error import JaclangOptionError
 from jaclang.error.syntax_error import JaclangSyntaxError
 
 
@@ -9,9 +11,17 @@ def main():
         print(
             """Usage: python3 -m jaclang [input_file] [output_file] [options]
 Options:
+- packrat: memoize expression parsing
+- inline_budget=<n>: instructions inlining small functions may add, functions called once are always inlined
+- no_inline: do not inline functions
 - debug_preprocess: print preprocessed code
 - debug_tokens: print tokens
 - debug_tree: print abstract syntax tree
+- debug_packrat: print packrat cache statistics
+- debug_cfg: print control flow graph, dominators and loops of every function
+- debug_dataflow: print liveness, reaching definitions and constants of every function
+- debug_ir: print how many instructions and bytes every IR pass and unused function removal removed
+- debug_peephole: print how often every peephole rule was applied
 - debug_assembly: print assembly code"""
         )
         return
@@ -23,18 +33,25 @@ Options:
     with open(input_file, "r") as file:
         file_contents = file.read()
 
+    # assembly is streamed into a temporary file, so a failed compilation does not leave a partial output file
+    temp_output_file = output_file + ".tmp"
     try:
-        assembly_code = compileJaclang(file_contents, options)
+        with open(temp_output_file, "w", buffering=1 << 16) as file:
+            assembly_num_lines = compileJaclangInto(file_contents, file, options)
+        os.replace(temp_output_file, output_file)
 
-        assembly_num_lines = len(assembly_code.splitlines())
         print(f"Assembly has {assembly_num_lines} lines")
 
-        with open(output_file, "w") as file:
-            file.write(assembly_code)
-
     except JaclangSyntaxError as error:
         error.printError(file_contents)
         exit(1)
+    except JaclangOptionError as error:
+        error.printError()
+        exit(1)
+    finally:
+        # whatever stopped the compilation, even an interrupt, the temporary file is removed if it was not moved
+        if os.path.exists(temp_output_file):
+            os.remove(temp_output_file)
 
 
 if __name__ == "__main__":
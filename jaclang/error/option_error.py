@@ -0,0 +1,10 @@
+from jaclang.error.syntax_error import RED, BOLD, CLEAR
+
+
+# an option given to the compiler has a value it can not use
+class JaclangOptionError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def printError(self):
+        print(f"{RED}{BOLD}OptionError: {self.message}{CLEAR}")
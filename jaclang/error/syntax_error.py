@@ -1,32 +1,80 @@
+from bisect import bisect_right
+from typing import Optional
+
 RED = '\033[91m'
 BOLD = '\033[1m'
 CLEAR = '\033[0m'
 
 
+# offsets where every line begins, so a position is turned into a line with a binary search
+class LineIndex:
+    def __init__(self, file_contents: str):
+        self.file_contents = file_contents
+        self.line_starts = [0]
+        pos = file_contents.find("\n")
+        while pos != -1:
+            self.line_starts.append(pos + 1)
+            pos = file_contents.find("\n", pos + 1)
+
+    # returns line number and the bounds of the line without the newline
+    def getLine(self, pos: int) -> (int, int, int):
+        line_num = bisect_right(self.line_starts, pos)
+        left = self.line_starts[line_num - 1]
+        if line_num < len(self.line_starts):
+            right = self.line_starts[line_num] - 1
+        else:
+            right = len(self.file_contents)
+        return line_num, left, right
+
+
 class JaclangSyntaxError(Exception):
     def __init__(self, pos: int, message: str):
         self.pos = pos
         self.message = message
 
-    def printError(self, file_contents: str):
+    def printError(self, file_contents: str, line_index: Optional[LineIndex] = None):
         print(f"{RED}{BOLD}SyntaxError: {self.message}")
         if self.pos == -1:
-            print("Error location not provided")
+            print("Error location not provided" + CLEAR)
         else:
-            right = self.pos
-            left = self.pos
-
-            while right < len(file_contents) and file_contents[right] != '\n':
-                right += 1
-
-            while left > 0 and file_contents[left - 1] != '\n':
-                left -= 1
-
-            line_num = 1
-            for i in range(self.pos):
-                if file_contents[i] == "\n":
-                    line_num += 1
+            if line_index is None:
+                line_index = LineIndex(file_contents)
+            line_num, left, right = line_index.getLine(self.pos)
 
             line_num_prefix = f"line {line_num}: "
             print(line_num_prefix + file_contents[left:right].replace("\t", " "))
             print(" " * (self.pos - left + len(line_num_prefix)) + "^" + CLEAR)
+
+
+# all errors of one compilation, raised once the compiler can not go on
+class JaclangSyntaxErrors(JaclangSyntaxError):
+    def __init__(self, errors: list[JaclangSyntaxError]):
+        super().__init__(errors[0].pos, errors[0].message)
+        self.errors = errors
+
+    def printError(self, file_contents: str, line_index: Optional[LineIndex] = None):
+        if line_index is None:
+            line_index = LineIndex(file_contents)
+        for error in self.errors:
+            error.printError(file_contents, line_index)
+        if len(self.errors) > 1:
+            print(f"{RED}{BOLD}{len(self.errors)} errors{CLEAR}")
+
+
+# collects errors the compiler could recover from, instead of stopping at the first one
+class ErrorCollector:
+    def __init__(self):
+        self.errors: list[JaclangSyntaxError] = []
+
+    def report(self, error: JaclangSyntaxError):
+        if isinstance(error, JaclangSyntaxErrors):
+            self.errors += error.errors
+        else:
+            self.errors.append(error)
+
+    def hasErrors(self) -> bool:
+        return len(self.errors) != 0
+
+    def raiseErrors(self):
+        if self.hasErrors():
+            raise JaclangSyntaxErrors(self.errors)
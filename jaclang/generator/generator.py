@@ -1,5 +1,6 @@
 from abc import abstractmethod
-from typing import Optional
+from copy import copy
+from typing import Optional, Iterable, TextIO
 
 
 class Parameter:
@@ -29,6 +30,12 @@ class Registers:
     STACK_TOP = RegisterParameter(7, "RSP", "rsp")
 
 
+# width of registers and memory cells of the target
+WORD_BITS = 64
+# bytes of program memory one instruction takes, the opcode and its three operands
+INSTRUCTION_BYTES = 4
+
+
 class ValueParameter(Parameter):
     def __init__(self, value: int):
         self.value = value
@@ -45,7 +52,16 @@ class LabelParameter(Parameter):
         return "{" + self.label_name + "}"
 
 
+# attributes instructions keep the parameters they read and the register they write in
+USED_PARAMETER_ATTRIBUTES = ("a", "b", "addr", "value", "val", "dest", "cond")
+DEFINED_REGISTER_ATTRIBUTES = ("reg_save", "reg")
+
+
 class Instruction:
+    # which of the parameter attributes every instruction type has, filled in the first time one is looked at
+    used_attributes: dict[type, tuple[str, ...]] = {}
+    defined_attributes: dict[type, tuple[str, ...]] = {}
+
     @abstractmethod
     def printInfo(self):
         pass
@@ -54,6 +70,57 @@ class Instruction:
     def intoRawAssembly(self) -> str:
         pass
 
+    def getUsedAttributes(self) -> tuple[str, ...]:
+        attributes = Instruction.used_attributes.get(type(self))
+        if attributes is None:
+            attributes = tuple(attribute for attribute in USED_PARAMETER_ATTRIBUTES if hasattr(self, attribute))
+            Instruction.used_attributes[type(self)] = attributes
+        return attributes
+
+    def getDefinedAttributes(self) -> tuple[str, ...]:
+        attributes = Instruction.defined_attributes.get(type(self))
+        if attributes is None:
+            attributes = tuple(attribute for attribute in DEFINED_REGISTER_ATTRIBUTES if hasattr(self, attribute))
+            Instruction.defined_attributes[type(self)] = attributes
+        return attributes
+
+    def getUsedParameters(self) -> list[Parameter]:
+        used_parameters = []
+        for attribute in self.getUsedAttributes():
+            parameter = getattr(self, attribute)
+            if isinstance(parameter, Parameter):
+                used_parameters.append(parameter)
+        return used_parameters
+
+    def usesRegister(self, register: RegisterParameter) -> bool:
+        for attribute in self.getUsedAttributes():
+            if getattr(self, attribute) is register:
+                return True
+        return False
+
+    # returns a copy of the instruction reading new_parameter wherever it read old_register
+    def replaceUsedRegister(self, old_register: RegisterParameter, new_parameter: Parameter) -> "Instruction":
+        instruction = copy(self)
+        for attribute in self.getUsedAttributes():
+            if getattr(self, attribute) is old_register:
+                setattr(instruction, attribute, new_parameter)
+        return instruction
+
+    def getDefinedRegister(self) -> Optional[RegisterParameter]:
+        for attribute in self.getDefinedAttributes():
+            register = getattr(self, attribute)
+            if isinstance(register, RegisterParameter):
+                return register
+        return None
+
+    # returns a copy of the instruction writing new_register instead of the register it defined
+    def replaceDefinedRegister(self, new_register: RegisterParameter) -> "Instruction":
+        instruction = copy(self)
+        for attribute in self.getDefinedAttributes():
+            if isinstance(getattr(self, attribute), RegisterParameter):
+                setattr(instruction, attribute, new_register)
+        return instruction
+
 
 def generate_raw_assembly(instruction_label: str, a: Optional[Parameter], b: Optional[Parameter], c: Optional[Parameter]) -> str:
     str1 = instruction_label
@@ -73,16 +140,21 @@ def generate_raw_assembly(instruction_label: str, a: Optional[Parameter], b: Opt
     return " ".join([str1] + strs) + "\n"
 
 
-def generate(instructions: list[Instruction], debug_output: bool = False) -> str:
+# writes the assembly of every instruction as soon as it is generated and returns the number of lines written
+def generate(instructions: Iterable[Instruction], output: TextIO, debug_output: bool = False) -> int:
     if debug_output:
         print("Generated assembly code:")
         print("---------------------------------")
-        for instruction in instructions:
-            instruction.printInfo()
-        print("---------------------------------")
 
-    assembly = ""
+    num_lines = 0
     for instruction in instructions:
-        assembly += instruction.intoRawAssembly()
+        if debug_output:
+            instruction.printInfo()
+        assembly = instruction.intoRawAssembly()
+        output.write(assembly)
+        num_lines += assembly.count("\n")
+
+    if debug_output:
+        print("---------------------------------")
 
-    return assembly
+    return num_lines
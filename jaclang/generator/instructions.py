@@ -324,3 +324,27 @@ class Instructions:
 
         def intoRawAssembly(self) -> str:
             return generate_raw_assembly("RECV", None, None, self.reg)
+
+
+# instructions that do nothing but write the register they define
+PURE_INSTRUCTIONS = (
+    Instructions.Add, Instructions.Subtract, Instructions.Multiply, Instructions.Divide, Instructions.Modulo,
+    Instructions.BitShiftLeft, Instructions.BitShiftRight, Instructions.Or, Instructions.And, Instructions.Xor,
+    Instructions.Not, Instructions.Equals, Instructions.NotEquals, Instructions.GreaterThan, Instructions.LessThan,
+    Instructions.GreaterThanEquals, Instructions.LessThanEquals, Instructions.Mov, Instructions.MemRead,
+)
+# cycles instructions take on the target, the ones not listed take one, change these to match the multiplier and
+# divider of the CPU the code runs on
+INSTRUCTION_CYCLES = {
+    Instructions.Multiply: 4,
+    Instructions.Divide: 16,
+    Instructions.Modulo: 16,
+}
+# whether the divider of the CPU the code runs on treats words as unsigned, divisions and remainders by powers of two
+# are only done with shifts and masks if it does, as those give other results for negative signed words
+UNSIGNED_DIVISION = True
+
+
+# labels are not counted, they do not take up program memory
+def count_instructions(instructions: list[Instruction]) -> int:
+    return sum(1 for instruction in instructions if type(instruction) is not Instructions.Label)
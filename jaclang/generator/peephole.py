@@ -0,0 +1,246 @@
+from abc import abstractmethod
+from typing import Optional, Iterable, Iterator
+
+from jaclang.generator.generator import Instruction, Registers, RegisterParameter, LabelParameter, ValueParameter, \
+    Parameter
+from jaclang.generator.instructions import Instructions, PURE_INSTRUCTIONS
+from jaclang.ir.cfg import split_functions
+
+# registers that only ever hold values, the stack registers are also used implicitly by push and pop
+VALUE_REGISTERS = [Registers.RETURN, Registers.REG1, Registers.REG2, Registers.REG3, Registers.REG4,
+                   Registers.EXPRESSION]
+# how far liveness looks ahead before it gives up and assumes a register is live
+LIVENESS_LOOKAHEAD = 64
+
+
+def same_parameter(a: Parameter, b: Parameter) -> bool:
+    if type(a) is ValueParameter and type(b) is ValueParameter:
+        return a.value == b.value
+    if type(a) is LabelParameter and type(b) is LabelParameter:
+        return a.label_name == b.label_name
+    return a is b
+
+
+# instructions that follow the window, the next one is last in pending
+class Lookahead:
+    def __init__(self, pending: list[Instruction]):
+        self.pending = pending
+
+    # whether the value register has now is never read, only code reached without jumping is looked at
+    def isDead(self, register: RegisterParameter) -> bool:
+        if register not in VALUE_REGISTERS:
+            return False
+        for i in range(len(self.pending) - 1, max(len(self.pending) - 1 - LIVENESS_LOOKAHEAD, -1), -1):
+            instruction = self.pending[i]
+            if instruction.usesRegister(register):
+                return False
+            if instruction.getDefinedRegister() is register:
+                return True
+            if type(instruction) is Instructions.Halt:
+                return True
+            if type(instruction) is Instructions.Jump:
+                return False
+        return False
+
+
+class PeepholeRule:
+    # types the first instruction of a window has to be of, None if the rule is tried on any window
+    first_types: Optional[tuple[type, ...]] = None
+    # the same for the last instruction of a window, the one that was just added to it
+    last_types: Optional[tuple[type, ...]] = None
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.window = window
+
+    # returns what replaces the window, or None if the rule does not apply
+    @abstractmethod
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        pass
+
+
+class PushPopRule(PeepholeRule):
+    first_types = (Instructions.Push,)
+    last_types = (Instructions.Pop,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        push, pop = window
+        if type(push) is Instructions.Push and type(pop) is Instructions.Pop:
+            return [Instructions.Mov(push.val, pop.reg)]
+        return None
+
+
+class SelfMoveRule(PeepholeRule):
+    first_types = (Instructions.Mov,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        mov, = window
+        if type(mov) is Instructions.Mov and mov.value is mov.reg_save:
+            return []
+        return None
+
+
+class JumpToNextRule(PeepholeRule):
+    first_types = (Instructions.Jump,)
+    last_types = (Instructions.Label,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        jump, label = window
+        if type(jump) is Instructions.Jump and type(label) is Instructions.Label and \
+                type(jump.dest) is LabelParameter and jump.dest.label_name == label.label_name:
+            return [label]
+        return None
+
+
+class StoreLoadRule(PeepholeRule):
+    first_types = (Instructions.MemoryWrite,)
+    last_types = (Instructions.MemRead,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        store, load = window
+        if type(store) is Instructions.MemoryWrite and type(load) is Instructions.MemRead and \
+                same_parameter(store.addr, load.addr) and store.addr_offset == load.addr_offset and \
+                store.addr is not load.reg_save:
+            return [store, Instructions.Mov(store.value, load.reg_save)]
+        return None
+
+
+class LoadStoreRule(PeepholeRule):
+    first_types = (Instructions.MemRead,)
+    last_types = (Instructions.MemoryWrite,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        load, store = window
+        if type(load) is Instructions.MemRead and type(store) is Instructions.MemoryWrite and \
+                same_parameter(store.addr, load.addr) and store.addr_offset == load.addr_offset and \
+                store.value is load.reg_save and load.addr is not load.reg_save:
+            return [load]
+        return None
+
+
+class IdentityOperationRule(PeepholeRule):
+    first_types = (Instructions.Add, Instructions.Subtract, Instructions.Or, Instructions.Xor,
+                   Instructions.BitShiftLeft, Instructions.BitShiftRight)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        operation, = window
+        if operation.a is operation.reg_save and type(operation.b) is ValueParameter and operation.b.value == 0:
+            return []
+        return None
+
+
+# reads the source of a move instead of its destination, if the destination is not needed afterwards
+# the instructions between the move and the one reading it must leave both registers alone
+class ForwardMoveRule(PeepholeRule):
+    first_types = (Instructions.Mov,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        mov, *between, user = window
+        if type(mov) is not Instructions.Mov or mov.reg_save not in VALUE_REGISTERS:
+            return None
+        if type(mov.value) is ValueParameter:
+            # only moves and pushes are known to take a value in place of any register
+            if type(user) not in (Instructions.Mov, Instructions.Push):
+                return None
+        elif type(mov.value) is not RegisterParameter or mov.value is Registers.STACK_TOP:
+            return None
+
+        if not user.usesRegister(mov.reg_save):
+            return None
+        if type(user) is Instructions.Jump:
+            return None
+        for instruction in between:
+            if type(instruction) in (Instructions.Label, Instructions.Jump, Instructions.Halt):
+                return None
+            if instruction.getDefinedRegister() in (mov.reg_save, mov.value):
+                return None
+            if instruction.usesRegister(mov.reg_save):
+                return None
+        if user.getDefinedRegister() is not mov.reg_save and not lookahead.isDead(mov.reg_save):
+            return None
+        return between + [user.replaceUsedRegister(mov.reg_save, mov.value)]
+
+
+# writes a result straight into the register it is moved to next
+class RetargetDefinitionRule(PeepholeRule):
+    last_types = (Instructions.Mov,)
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        definition, mov = window
+        if type(mov) is not Instructions.Mov or type(mov.value) is not RegisterParameter:
+            return None
+        if definition.getDefinedRegister() is not mov.value:
+            return None
+        if not lookahead.isDead(mov.value):
+            return None
+        return [definition.replaceDefinedRegister(mov.reg_save)]
+
+
+class DeadDefinitionRule(PeepholeRule):
+    first_types = PURE_INSTRUCTIONS
+
+    def apply(self, window: list[Instruction], lookahead: Lookahead) -> Optional[list[Instruction]]:
+        instruction, = window
+        if lookahead.isDead(instruction.getDefinedRegister()):
+            return []
+        return None
+
+
+class PeepholeOptimizer:
+    rules: list[PeepholeRule] = [
+        SelfMoveRule("self move", 1),
+        IdentityOperationRule("identity operation", 1),
+        PushPopRule("push pop", 2),
+        JumpToNextRule("jump to next", 2),
+        StoreLoadRule("store load", 2),
+        LoadStoreRule("load store", 2),
+        ForwardMoveRule("forward move", 2),
+        ForwardMoveRule("forward move past one", 3),
+        RetargetDefinitionRule("retarget definition", 2),
+        DeadDefinitionRule("dead definition", 1),
+    ]
+
+    def __init__(self):
+        self.hits = {rule.name: 0 for rule in self.rules}
+
+    # functions are optimized one at a time, everything else is passed through as it is generated
+    def optimize(self, instructions: Iterable[Instruction]) -> Iterator[Instruction]:
+        for chunk in split_functions(instructions):
+            yield from self.optimizeChunk(chunk)
+
+    def optimizeChunk(self, chunk: list[Instruction]) -> list[Instruction]:
+        changed = True
+        while changed:
+            chunk, changed = self.optimizePass(chunk)
+        return chunk
+
+    # every instruction is moved from pending to output and rules are tried on the windows that end with it,
+    # replacements go back to pending so they are looked at again together with what is in front of them
+    def optimizePass(self, chunk: list[Instruction]) -> (list[Instruction], bool):
+        pending = chunk[::-1]
+        lookahead = Lookahead(pending)
+        output = []
+        changed = False
+        rules = [(rule, rule.window, rule.first_types, rule.last_types) for rule in self.rules]
+        while pending:
+            instruction = pending.pop()
+            output.append(instruction)
+            for rule, window, first_types, last_types in rules:
+                if len(output) < window or (first_types is not None and type(output[-window]) not in first_types) or \
+                        (last_types is not None and type(instruction) not in last_types):
+                    continue
+                replacement = rule.apply(output[-window:], lookahead)
+                if replacement is not None:
+                    del output[-window:]
+                    pending.extend(reversed(replacement))
+                    self.hits[rule.name] += 1
+                    changed = True
+                    break
+        return output, changed
+
+    def printStats(self):
+        print("Peephole optimizer:")
+        print("---------------------------------")
+        for name, hits in self.hits.items():
+            print(f"{name}: {hits}")
+        print("---------------------------------")
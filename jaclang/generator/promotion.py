@@ -0,0 +1,199 @@
+from bisect import bisect_left
+from typing import Optional
+
+from jaclang.generator.generator import Instruction, Registers, RegisterParameter, LabelParameter, ValueParameter
+from jaclang.generator.instructions import Instructions
+
+# registers locals can be kept in, expressions take temporaries from the front of the same list
+PROMOTABLE_REGISTERS = [Registers.REG4, Registers.REG3, Registers.REG2, Registers.REG1]
+# every loop a reference is nested in makes it this many times more valuable
+LOOP_WEIGHT = 8
+
+
+class StackSlot:
+    def __init__(self, offset: int):
+        self.offset = offset
+        self.begin = -1
+        self.end = -1
+        self.weight = 0
+        self.register: Optional[RegisterParameter] = None
+
+
+class CallSite:
+    def __init__(self, push_index: int, jump_index: int, label_index: int):
+        self.push_index = push_index
+        self.jump_index = jump_index
+        self.label_index = label_index
+
+
+def stack_slot_offset(instruction: Instruction) -> Optional[int]:
+    if type(instruction) in (Instructions.MemRead, Instructions.MemoryWrite) and \
+            instruction.addr is Registers.STACK_BASE:
+        return instruction.addr_offset
+    return None
+
+
+# a tail call takes the frame down before it jumps, no slot is accessed after that
+def is_frame_teardown(instruction: Instruction) -> bool:
+    return type(instruction) is Instructions.Mov and instruction.value is Registers.STACK_BASE and \
+        instruction.reg_save is Registers.STACK_TOP
+
+
+def find_loops(instructions: list[Instruction]) -> list[tuple[int, int]]:
+    label_indices = {}
+    loops = []
+    for i, instruction in enumerate(instructions):
+        if type(instruction) is Instructions.Label:
+            label_indices[instruction.label_name] = i
+        elif type(instruction) is Instructions.Jump and type(instruction.dest) is LabelParameter:
+            begin = label_indices.get(instruction.dest.label_name)
+            if begin is not None:
+                loops.append((begin, i))
+    return loops
+
+
+# a call pushes its return label, jumps to the function and places the label right after the jump
+def find_call_sites(instructions: list[Instruction]) -> list[CallSite]:
+    push_indices = {}
+    call_sites = []
+    for i, instruction in enumerate(instructions):
+        if type(instruction) is Instructions.Push and type(instruction.val) is LabelParameter:
+            push_indices[instruction.val.label_name] = i
+        elif type(instruction) is Instructions.Label and instruction.label_name in push_indices and i > 0:
+            jump = instructions[i - 1]
+            if type(jump) is Instructions.Jump and type(jump.dest) is LabelParameter and jump.cond is None:
+                call_sites.append(CallSite(push_indices[instruction.label_name], i - 1, i))
+    return call_sites
+
+
+# keeps the locals and arguments of a function body in free registers instead of its stack frame, a register is
+# only given to a slot if nothing else uses it while the slot is live, and callers save it around calls
+def promote_locals(instructions: list[Instruction], args_num: int) -> list[Instruction]:
+    slots: dict[int, StackSlot] = {}
+    for i, instruction in enumerate(instructions):
+        offset = stack_slot_offset(instruction)
+        if offset is None:
+            if Registers.STACK_BASE in instruction.getUsedParameters() and not is_frame_teardown(instruction):
+                # the frame is accessed some other way, so no slot is known to be only accessed directly
+                return instructions
+            continue
+        if not (offset >= 0 or -args_num - 1 <= offset <= -2):
+            continue
+        slot = slots.setdefault(offset, StackSlot(offset))
+        if slot.begin == -1:
+            # arguments already hold their value when the body begins
+            slot.begin = 0 if offset < 0 else i
+        slot.end = i
+
+    if not slots:
+        return instructions
+
+    loops = find_loops(instructions)
+    loop_depths = [0] * len(instructions)
+    for begin, end in loops:
+        for i in range(begin, end + 1):
+            loop_depths[i] += 1
+
+    # the value of a slot referenced in a loop has to survive the whole loop
+    for slot in slots.values():
+        changed = True
+        while changed:
+            changed = False
+            for begin, end in loops:
+                if slot.begin <= end and slot.end >= begin and (begin < slot.begin or end > slot.end):
+                    slot.begin = min(slot.begin, begin)
+                    slot.end = max(slot.end, end)
+                    changed = True
+
+    for i, instruction in enumerate(instructions):
+        offset = stack_slot_offset(instruction)
+        if offset in slots:
+            slots[offset].weight += LOOP_WEIGHT ** loop_depths[i]
+
+    call_sites = find_call_sites(instructions)
+    register_references = {register: [] for register in PROMOTABLE_REGISTERS}
+    for i, instruction in enumerate(instructions):
+        for parameter in instruction.getUsedParameters() + [instruction.getDefinedRegister()]:
+            if parameter in register_references:
+                register_references[parameter].append(i)
+
+    taken_intervals = {register: [] for register in PROMOTABLE_REGISTERS}
+    for slot in sorted(slots.values(), key=lambda promoted_slot: -promoted_slot.weight):
+        # saving and restoring around calls costs two instructions, loading an argument costs one
+        cost = 2 * sum(LOOP_WEIGHT ** loop_depths[call.jump_index] for call in call_sites
+                       if slot.begin < call.jump_index < slot.end)
+        if slot.offset < 0:
+            cost += 1
+        if slot.weight <= cost:
+            continue
+
+        for register in PROMOTABLE_REGISTERS:
+            references = register_references[register]
+            first_reference = bisect_left(references, slot.begin)
+            if first_reference < len(references) and references[first_reference] <= slot.end:
+                continue
+            if any(slot.begin <= end and slot.end >= begin for begin, end in taken_intervals[register]):
+                continue
+            slot.register = register
+            taken_intervals[register].append((slot.begin, slot.end))
+            break
+
+    promoted = [slot for slot in slots.values() if slot.register is not None]
+    if not promoted:
+        return instructions
+
+    saves_before: dict[int, list[RegisterParameter]] = {}
+    restores_after: dict[int, list[RegisterParameter]] = {}
+    for call in call_sites:
+        saved = [slot.register for slot in promoted if slot.begin < call.jump_index < slot.end]
+        if saved:
+            saves_before.setdefault(call.push_index, []).extend(saved)
+            restores_after.setdefault(call.label_index, []).extend(reversed(saved))
+
+    result = [
+        Instructions.MemRead(Registers.STACK_BASE, slot.offset, slot.register) for slot in promoted if slot.offset < 0
+    ]
+    for i, instruction in enumerate(instructions):
+        for register in saves_before.get(i, []):
+            result.append(Instructions.Push(register))
+
+        offset = stack_slot_offset(instruction)
+        slot = slots.get(offset) if offset is not None else None
+        if slot is None or slot.register is None:
+            result.append(instruction)
+        elif type(instruction) is Instructions.MemRead:
+            result.append(Instructions.Mov(slot.register, instruction.reg_save))
+        else:
+            result.append(Instructions.Mov(instruction.value, slot.register))
+
+        for register in restores_after.get(i, []):
+            result.append(Instructions.Pop(register))
+
+    return result
+
+
+# the body of a function begins with the label recursive tail calls jump to and ends before its return label, the frame
+# is set up before it and taken down after it, taking it down also removes the arguments from the stack
+# arguments are loaded into their registers before the label, as tail calls leave their new values there
+def promote_function(chunk: list[Instruction]) -> list[Instruction]:
+    if not chunk or type(chunk[0]) is not Instructions.Label:
+        return chunk
+    name = chunk[0].label_name
+    body_begin = body_end = None
+    for i, instruction in enumerate(chunk):
+        if type(instruction) is Instructions.Label:
+            if instruction.label_name == name + "_body":
+                body_begin = i
+            elif instruction.label_name == name + "_return":
+                body_end = i
+    if body_begin is None or body_end is None:
+        return chunk
+
+    args_num = None
+    for instruction in chunk[body_end:]:
+        if type(instruction) is Instructions.Subtract and instruction.reg_save is Registers.STACK_TOP and \
+                type(instruction.b) is ValueParameter:
+            args_num = instruction.b.value
+    if args_num is None:
+        return chunk
+    return chunk[:body_begin] + promote_locals(chunk[body_begin:body_end], args_num) + chunk[body_end:]
@@ -0,0 +1,15 @@
+from jaclang.ir.analyses import Liveness, ReachingDefinitions, ConstantPropagation
+from jaclang.ir.block import BasicBlock, Loop
+from jaclang.ir.cfg import ControlFlowGraph, build_cfg, split_functions
+from jaclang.ir.dataflow import DataflowAnalysis
+from jaclang.ir.dominators import compute_dominators
+from jaclang.ir.effects import LocationTable, Effects
+from jaclang.ir.loops import find_loops
+from jaclang.ir.optimizer import IrOptimizer, IrPass
+# passes
+from jaclang.ir import elimination, jumps, numbering, strength
+
+numbering.load()
+elimination.load()
+strength.load()
+jumps.load()
@@ -0,0 +1,234 @@
+from typing import Optional, Iterator
+
+from jaclang.generator import Instruction, Instructions
+from jaclang.generator.generator import Parameter, RegisterParameter, ValueParameter
+from jaclang.ir.block import BasicBlock
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.dataflow import DataflowAnalysis
+from jaclang.ir.effects import LocationTable, register_bit, iterate_bits
+from jaclang.parser.expression.operators import Operator
+
+# operators by the instruction they are applied with, to evaluate instructions with constant operands
+OPERATORS_BY_INSTRUCTION = {operator.instruction: operator for operator in Operator.operators.values()}
+
+
+# locations whose value may still be read, a location is live before an instruction if it is read by it,
+# or live after it and not overwritten by it
+class Liveness(DataflowAnalysis):
+    forward = False
+
+    def __init__(self, cfg: ControlFlowGraph, locations: LocationTable):
+        super().__init__(cfg, locations)
+        # what every block reads before overwriting it and what it overwrites, so blocks are only walked once
+        self.block_uses: dict[BasicBlock, int] = {}
+        self.block_defs: dict[BasicBlock, int] = {}
+        for block in cfg.blocks:
+            uses = 0
+            defs = 0
+            for instruction in reversed(block.instructions):
+                effects = locations.getEffects(instruction)
+                uses = (uses & ~effects.defs) | effects.uses
+                defs |= effects.defs
+            self.block_uses[block] = uses
+            self.block_defs[block] = defs
+
+    def transferInstruction(self, instruction: Instruction, state: int) -> int:
+        effects = self.locations.getEffects(instruction)
+        return (state & ~effects.defs) | effects.uses
+
+    def transferBlock(self, block: BasicBlock, state: int) -> int:
+        return (state & ~self.block_defs[block]) | self.block_uses[block]
+
+
+# definitions whose value may still be in the location they wrote, every location an instruction writes is
+# a definition of its own
+class ReachingDefinitions(DataflowAnalysis):
+    def __init__(self, cfg: ControlFlowGraph, locations: LocationTable):
+        super().__init__(cfg, locations)
+        # instruction and location of every definition
+        self.definitions: list[tuple[Instruction, int]] = []
+        # the first definition of every instruction, the ones of its other locations follow it
+        self.first_definitions: dict[int, int] = {}
+        # definitions of every location, the bitsets are built from bytes at the end as they can get very long
+        location_bitmaps = [bytearray() for _ in range(len(locations))]
+        for block in cfg.blocks:
+            for instruction in block.instructions:
+                effects = locations.getEffects(instruction)
+                written = effects.defs | effects.may_defs
+                if not written:
+                    continue
+                self.first_definitions[id(instruction)] = len(self.definitions)
+                for location in iterate_bits(written):
+                    definition_id = len(self.definitions)
+                    self.definitions.append((instruction, location))
+                    bitmap = location_bitmaps[location]
+                    bitmap.extend(bytes((definition_id >> 3) - len(bitmap) + 1))
+                    bitmap[definition_id >> 3] |= 1 << (definition_id & 7)
+        self.location_definitions = [int.from_bytes(bitmap, "little") for bitmap in location_bitmaps]
+
+        # the long bitsets are only touched once per block and location
+        self.block_gen: dict[BasicBlock, int] = {}
+        self.block_kill: dict[BasicBlock, int] = {}
+        for block in cfg.blocks:
+            generated: dict[int, list[int]] = {}
+            killed_locations = 0
+            for instruction in block.instructions:
+                for definition_id, location, kills in self.getDefinitions(instruction):
+                    if kills:
+                        killed_locations |= 1 << location
+                        generated[location] = []
+                    generated.setdefault(location, []).append(definition_id)
+            gen = 0
+            for definition_ids in generated.values():
+                for definition_id in definition_ids:
+                    gen |= 1 << definition_id
+            kill = 0
+            for location in iterate_bits(killed_locations):
+                kill |= self.location_definitions[location]
+            self.block_gen[block] = gen
+            self.block_kill[block] = kill & ~gen
+
+    # definitions of the instruction with their location and whether they always overwrite it
+    def getDefinitions(self, instruction: Instruction) -> Iterator[tuple[int, int, bool]]:
+        definition_id = self.first_definitions.get(id(instruction))
+        if definition_id is None:
+            return
+        effects = self.locations.getEffects(instruction)
+        for location in iterate_bits(effects.defs | effects.may_defs):
+            yield definition_id, location, bool(effects.defs >> location & 1)
+            definition_id += 1
+
+    def transferInstruction(self, instruction: Instruction, state: int) -> int:
+        for definition_id, location, kills in self.getDefinitions(instruction):
+            if kills:
+                state &= ~self.location_definitions[location]
+            state |= 1 << definition_id
+        return state
+
+    def transferBlock(self, block: BasicBlock, state: int) -> int:
+        return (state & ~self.block_kill[block]) | self.block_gen[block]
+
+    # instructions that may have written the value the location has in state
+    def getDefinitionsOf(self, state: int, location: int) -> list[Instruction]:
+        definitions = state & self.location_definitions[location]
+        return [self.definitions[i][0] for i in iterate_bits(definitions)]
+
+
+# locations known to hold a constant, as a dict from location bit to value, None for points that are never reached
+# a conditional jump on a known condition only passes its state along the edge it takes, so code behind a jump that
+# is never taken stays unreached
+class ConstantPropagation(DataflowAnalysis):
+    def getBoundary(self) -> Optional[dict[int, int]]:
+        return {}
+
+    def getInitial(self) -> Optional[dict[int, int]]:
+        return None
+
+    def meet(self, state1: Optional[dict[int, int]], state2: Optional[dict[int, int]]) -> Optional[dict[int, int]]:
+        if state1 is None:
+            return state2
+        if state2 is None:
+            return state1
+        return {location: value for location, value in state1.items() if state2.get(location) == value}
+
+    def getValue(self, state: Optional[dict[int, int]], parameter: Parameter) -> Optional[int]:
+        if type(parameter) is ValueParameter:
+            return parameter.value
+        if type(parameter) is RegisterParameter and state is not None:
+            return state.get(register_bit(parameter))
+        return None
+
+    def getEdgeState(self, block: BasicBlock, successor: BasicBlock,
+                     state: Optional[dict[int, int]]) -> Optional[dict[int, int]]:
+        terminator = block.getTerminator()
+        if state is None or type(terminator) is not Instructions.Jump or terminator.cond is None or \
+                block.jump_target is block.fall_through:
+            return state
+        condition = self.getValue(state, terminator.cond)
+        if condition is None:
+            return state
+        taken = block.jump_target if condition == 1 else block.fall_through
+        return state if successor is taken else None
+
+    def transferInstruction(self, instruction: Instruction, state: Optional[dict[int, int]]) -> \
+            Optional[dict[int, int]]:
+        if state is None:
+            return None
+        state = dict(state)
+        self.update(instruction, state)
+        return state
+
+    # the state is copied once for the whole block and changed in place by every instruction
+    def transferBlock(self, block: BasicBlock, state: Optional[dict[int, int]]) -> Optional[dict[int, int]]:
+        if state is None:
+            return None
+        state = dict(state)
+        for instruction in block.instructions:
+            self.update(instruction, state)
+        return state
+
+    # most instructions write a single location, only that entry is changed then, the whole state is only
+    # filtered for instructions that may write several locations like calls
+    def update(self, instruction: Instruction, state: dict[int, int]):
+        effects = self.locations.getEffects(instruction)
+        written = effects.defs | effects.may_defs
+        if not written:
+            return
+
+        value = self.evaluate(instruction, state)
+        if written & (written - 1) == 0:
+            state.pop(written, None)
+        else:
+            for location in [location for location in state if location & written]:
+                del state[location]
+        # the value is only known for instructions writing a single location
+        if value is not None and effects.defs & (effects.defs - 1) == 0:
+            state[effects.defs] = value
+
+    # the value an instruction writes into the one location it defines, if it is known
+    def evaluate(self, instruction: Instruction, state: dict[int, int]) -> Optional[int]:
+        instruction_type = type(instruction)
+        if instruction_type is Instructions.Mov:
+            return self.getValue(state, instruction.value)
+        if instruction_type is Instructions.MemoryWrite:
+            if self.locations.getMemoryBit(instruction.addr, instruction.addr_offset) is None:
+                return None
+            return self.getValue(state, instruction.value)
+        if instruction_type is Instructions.MemRead:
+            bit = self.locations.getMemoryBit(instruction.addr, instruction.addr_offset)
+            return state.get(bit) if bit is not None else None
+
+        operator = OPERATORS_BY_INSTRUCTION.get(instruction_type)
+        if operator is None:
+            return None
+        a = self.getValue(state, instruction.a)
+        b = self.getValue(state, instruction.b)
+        if a is None or b is None:
+            return None
+        return operator.fold(a, b)
+
+
+def print_analyses(cfg: ControlFlowGraph):
+    locations = LocationTable(cfg)
+    liveness = Liveness(cfg, locations).solve()
+    reaching_definitions = ReachingDefinitions(cfg, locations).solve()
+    constants = ConstantPropagation(cfg, locations).solve()
+
+    def format_constants(state: Optional[dict[int, int]]) -> str:
+        if state is None:
+            return "unreached"
+        return ", ".join(f"{locations.getNames(location)[0]}={value}" for location, value in sorted(state.items()))
+
+    print(f"Dataflow of {cfg.name}:")
+    print("---------------------------------")
+    for block in cfg.blocks:
+        print(f"block {block.index}:")
+        print(f"  live in: {' '.join(locations.getNames(liveness.block_in[block]))}")
+        print(f"  reaching definitions: {bin(reaching_definitions.block_in[block]).count('1')}")
+        print(f"  constants: {format_constants(constants.block_in[block])}")
+        for instruction, _, live_after in liveness.getInstructionStates(block):
+            instruction.printInfo()
+            if type(instruction) not in (Instructions.Label, Instructions.Halt):
+                print(f"        live: {' '.join(locations.getNames(live_after))}")
+        print(f"  live out: {' '.join(locations.getNames(liveness.block_out[block]))}")
+    print("---------------------------------")
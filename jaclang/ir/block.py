@@ -0,0 +1,61 @@
+from typing import Optional
+
+from jaclang.generator import Instruction, Instructions
+
+
+class BasicBlock:
+    def __init__(self, index: int, instructions: list[Instruction]):
+        # position of the block in the function, blocks are lowered in this order
+        self.index = index
+        # the label the block begins with is kept as its first instruction
+        self.instructions = instructions
+        self.successors: list[BasicBlock] = []
+        self.predecessors: list[BasicBlock] = []
+        # block the last instruction continues to if it does not jump, None if it always jumps or stops
+        self.fall_through: Optional[BasicBlock] = None
+        # block a jump at the end of the block goes to, if it goes to a label of the function
+        self.jump_target: Optional[BasicBlock] = None
+
+        # filled in by compute_dominators, None for blocks that can not be reached
+        self.immediate_dominator: Optional[BasicBlock] = None
+        self.dominated: list[BasicBlock] = []
+        self.dominator_order = (-1, -1)
+        # filled in by find_loops, the innermost loop the block is in
+        self.loop: Optional["Loop"] = None
+
+    def getLabel(self) -> Optional[str]:
+        if self.instructions and type(self.instructions[0]) is Instructions.Label:
+            return self.instructions[0].label_name
+        return None
+
+    def getTerminator(self) -> Optional[Instruction]:
+        if self.instructions and type(self.instructions[-1]) in (Instructions.Jump, Instructions.Halt):
+            return self.instructions[-1]
+        return None
+
+    def isReachable(self) -> bool:
+        return self.dominator_order[0] != -1
+
+    # every block dominates itself, only valid after compute_dominators
+    def dominates(self, other: "BasicBlock") -> bool:
+        return self.dominator_order[0] <= other.dominator_order[0] and \
+            other.dominator_order[1] <= self.dominator_order[1] and other.isReachable()
+
+    def getLoopDepth(self) -> int:
+        return self.loop.depth if self.loop is not None else 0
+
+    def printInfo(self):
+        label = self.getLabel()
+        name = f"block {self.index}" + (f" ({label})" if label is not None else "")
+        successors = ", ".join(str(successor.index) for successor in self.successors) or "-"
+        dominator = self.immediate_dominator.index if self.immediate_dominator is not None else "-"
+        print(f"{name}: {len(self.instructions)} instructions, successors: {successors}, "
+              f"immediate dominator: {dominator}, loop depth: {self.getLoopDepth()}")
+
+
+class Loop:
+    def __init__(self, header: BasicBlock, blocks: list[BasicBlock]):
+        self.header = header
+        self.blocks = blocks
+        self.parent: Optional[Loop] = None
+        self.depth = 1
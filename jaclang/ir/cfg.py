@@ -0,0 +1,135 @@
+from typing import Optional, Iterable, Iterator
+
+from jaclang.generator import Instruction, Instructions
+from jaclang.generator.generator import LabelParameter, RegisterParameter
+from jaclang.generator.instructions import count_instructions
+from jaclang.ir.block import BasicBlock, Loop
+
+
+# splits generated code into functions and the start code, every part ends with its return jump or halt
+def split_functions(instructions: Iterable[Instruction]) -> Iterator[list[Instruction]]:
+    chunk = []
+    for instruction in instructions:
+        chunk.append(instruction)
+        if type(instruction) is Instructions.Halt or \
+                (type(instruction) is Instructions.Jump and type(instruction.dest) is RegisterParameter):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_function_name(chunk: list[Instruction]) -> Optional[str]:
+    if chunk and type(chunk[0]) is Instructions.Label and chunk[0].label_name.startswith("func_"):
+        return chunk[0].label_name
+    return None
+
+
+class ControlFlowGraph:
+    def __init__(self, name: str, blocks: list[BasicBlock]):
+        self.name = name
+        self.blocks = blocks
+        self.entry = blocks[0]
+        self.exit: Optional[BasicBlock] = None
+        for block in blocks:
+            if block.getLabel() == name + "_return":
+                self.exit = block
+        # filled in by find_loops, outer loops come before the loops nested in them
+        self.loops: list[Loop] = []
+        self.next_label_id = 0
+
+    # the label of the block, one is added if the block does not begin with a label
+    def requestLabel(self, block: BasicBlock) -> str:
+        label = block.getLabel()
+        if label is None:
+            label = f"{self.name}_block_{self.next_label_id}"
+            self.next_label_id += 1
+            block.instructions.insert(0, Instructions.Label(label))
+        return label
+
+    # replaces the blocks and links them again, their fall throughs and jump targets have to be set already
+    def setBlocks(self, blocks: list[BasicBlock]):
+        self.blocks = blocks
+        for i, block in enumerate(blocks):
+            block.index = i
+            block.predecessors = []
+        for block in blocks:
+            connect_block(block)
+        if self.exit not in blocks:
+            self.exit = None
+
+    def countInstructions(self) -> int:
+        return sum(count_instructions(block.instructions) for block in self.blocks)
+
+    # blocks that fall through to a block that is not placed after them get a jump to it
+    def lower(self) -> list[Instruction]:
+        instructions = []
+        for i, block in enumerate(self.blocks):
+            instructions += block.instructions
+            next_block = self.blocks[i + 1] if i + 1 < len(self.blocks) else None
+            if block.fall_through is not None and block.fall_through is not next_block:
+                instructions.append(Instructions.Jump(LabelParameter(self.requestLabel(block.fall_through)), None))
+        return instructions
+
+    def printInfo(self):
+        print(f"Control flow graph of {self.name}:")
+        print("---------------------------------")
+        for block in self.blocks:
+            block.printInfo()
+        for loop in self.loops:
+            blocks = ", ".join(str(block.index) for block in loop.blocks)
+            print(f"loop at block {loop.header.index}, depth {loop.depth}: {blocks}")
+        print("---------------------------------")
+
+
+# a block begins at every label and ends after every jump, both passes over the instructions are linear
+def build_cfg(instructions: list[Instruction]) -> ControlFlowGraph:
+    blocks = []
+    current = []
+    for instruction in instructions:
+        if type(instruction) is Instructions.Label and current:
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+        current.append(instruction)
+        if type(instruction) in (Instructions.Jump, Instructions.Halt):
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+    if current or not blocks:
+        blocks.append(BasicBlock(len(blocks), current))
+
+    name = get_function_name(instructions)
+    # a call pushes the label it returns to, a jump to another function without one is a tail call
+    return_labels = {instruction.val.label_name for instruction in instructions
+                     if type(instruction) is Instructions.Push and type(instruction.val) is LabelParameter}
+    labels = {}
+    for block in blocks:
+        label = block.getLabel()
+        # a jump to the entry of the function is a recursive call
+        if label is not None and label != name:
+            labels[label] = block
+
+    for i, block in enumerate(blocks):
+        next_block = blocks[i + 1] if i + 1 < len(blocks) else None
+        terminator = block.getTerminator()
+        if terminator is None:
+            block.fall_through = next_block
+        elif type(terminator) is Instructions.Jump and type(terminator.dest) is LabelParameter:
+            target = labels.get(terminator.dest.label_name)
+            if target is not None:
+                block.jump_target = target
+                if terminator.cond is not None:
+                    block.fall_through = next_block
+            elif terminator.cond is None and next_block is not None and next_block.getLabel() in return_labels:
+                # a call, the called function returns to the label after the jump
+                block.fall_through = next_block
+        connect_block(block)
+
+    return ControlFlowGraph(name or "start", blocks)
+
+
+def connect_block(block: BasicBlock):
+    block.successors = []
+    for successor in (block.jump_target, block.fall_through):
+        if successor is not None and successor not in block.successors:
+            block.successors.append(successor)
+            successor.predecessors.append(block)
@@ -0,0 +1,112 @@
+from abc import abstractmethod
+from heapq import heappush, heappop
+from typing import Iterator
+
+from jaclang.generator import Instruction
+from jaclang.ir.block import BasicBlock
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.dominators import reverse_postorder
+from jaclang.ir.effects import LocationTable
+
+
+# an analysis gives every point of a function a state, sets of locations or definitions are ints used as bitsets
+class DataflowAnalysis:
+    # forward analyses go from the entry along the edges, backward ones from the exits against them
+    forward = True
+
+    def __init__(self, cfg: ControlFlowGraph, locations: LocationTable):
+        self.cfg = cfg
+        self.locations = locations
+        # state before and after every block, in program order, filled in by solve
+        self.block_in: dict[BasicBlock, object] = {}
+        self.block_out: dict[BasicBlock, object] = {}
+
+    # state at the entry of a forward analysis or at the exits of a backward one
+    def getBoundary(self) -> object:
+        return 0
+
+    # state of points the analysis has not reached yet
+    def getInitial(self) -> object:
+        return 0
+
+    def meet(self, state1: object, state2: object) -> object:
+        return state1 | state2
+
+    # state that flows along the edge from block to successor, for analyses that know some edges are never taken
+    def getEdgeState(self, block: BasicBlock, successor: BasicBlock, state: object) -> object:
+        return state
+
+    # state after the instruction for forward analyses, before it for backward ones
+    @abstractmethod
+    def transferInstruction(self, instruction: Instruction, state: object) -> object:
+        pass
+
+    def transferBlock(self, block: BasicBlock, state: object) -> object:
+        instructions = block.instructions if self.forward else reversed(block.instructions)
+        for instruction in instructions:
+            state = self.transferInstruction(instruction, state)
+        return state
+
+    # blocks are taken from the worklist in reverse postorder (postorder going backward), so most are visited once
+    # before their state is needed and loops are the only thing iterated
+    def solve(self) -> "DataflowAnalysis":
+        order = reverse_postorder(self.cfg)
+        if not self.forward:
+            order.reverse()
+        priorities = {block: i for i, block in enumerate(order)}
+        for block in self.cfg.blocks:
+            self.block_in[block] = self.getInitial()
+            self.block_out[block] = self.getInitial()
+
+        worklist = list(range(len(order)))
+        queued = [True] * len(order)
+        while worklist:
+            i = heappop(worklist)
+            queued[i] = False
+            block = order[i]
+
+            if self.forward:
+                state = self.getBoundary() if block is self.cfg.entry else self.getInitial()
+                for predecessor in block.predecessors:
+                    if predecessor in priorities:
+                        state = self.meet(state, self.getEdgeState(predecessor, block, self.block_out[predecessor]))
+                self.block_in[block] = state
+                new_state = self.transferBlock(block, state)
+                if new_state == self.block_out[block]:
+                    continue
+                self.block_out[block] = new_state
+                neighbours = block.successors
+            else:
+                state = self.getBoundary() if not block.successors else self.getInitial()
+                for successor in block.successors:
+                    state = self.meet(state, self.block_in[successor])
+                self.block_out[block] = state
+                new_state = self.transferBlock(block, state)
+                if new_state == self.block_in[block]:
+                    continue
+                self.block_in[block] = new_state
+                neighbours = block.predecessors
+
+            for neighbour in neighbours:
+                priority = priorities.get(neighbour)
+                if priority is not None and not queued[priority]:
+                    queued[priority] = True
+                    heappush(worklist, priority)
+        return self
+
+    # every instruction of the block with the states right before and after it
+    def getInstructionStates(self, block: BasicBlock) -> Iterator[tuple[Instruction, object, object]]:
+        if self.forward:
+            state = self.block_in[block]
+            for instruction in block.instructions:
+                state_after = self.transferInstruction(instruction, state)
+                yield instruction, state, state_after
+                state = state_after
+        else:
+            states = []
+            state = self.block_out[block]
+            for instruction in reversed(block.instructions):
+                state_before = self.transferInstruction(instruction, state)
+                states.append((instruction, state_before, state))
+                state = state_before
+            yield from reversed(states)
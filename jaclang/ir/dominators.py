@@ -0,0 +1,74 @@
+from jaclang.ir.block import BasicBlock
+from jaclang.ir.cfg import ControlFlowGraph
+
+
+# blocks reachable from the entry, every block comes before the blocks it reaches unless through a back edge
+# the block a jump falls through to is visited first, so the body of a loop with its condition at the bottom is
+# placed before the code after the loop instead of after all of it
+def reverse_postorder(cfg: ControlFlowGraph) -> list[BasicBlock]:
+    postorder = []
+    visited = {cfg.entry}
+    stack = [(cfg.entry, reversed(cfg.entry.successors))]
+    while stack:
+        block, successors = stack[-1]
+        successor = next(successors, None)
+        if successor is None:
+            stack.pop()
+            postorder.append(block)
+        elif successor not in visited:
+            visited.add(successor)
+            stack.append((successor, reversed(successor.successors)))
+    return postorder[::-1]
+
+
+# the iterative algorithm of Cooper, Harvey and Kennedy, it settles after a few passes on structured code
+def compute_dominators(cfg: ControlFlowGraph):
+    for block in cfg.blocks:
+        block.immediate_dominator = None
+        block.dominated = []
+        block.dominator_order = (-1, -1)
+
+    order = reverse_postorder(cfg)
+    position = {block: i for i, block in enumerate(order)}
+    cfg.entry.immediate_dominator = cfg.entry
+
+    def intersect(block1: BasicBlock, block2: BasicBlock) -> BasicBlock:
+        while block1 is not block2:
+            while position[block1] > position[block2]:
+                block1 = block1.immediate_dominator
+            while position[block2] > position[block1]:
+                block2 = block2.immediate_dominator
+        return block1
+
+    changed = True
+    while changed:
+        changed = False
+        for block in order[1:]:
+            dominator = None
+            for predecessor in block.predecessors:
+                if predecessor.immediate_dominator is None:
+                    continue
+                dominator = predecessor if dominator is None else intersect(predecessor, dominator)
+            if dominator is not block.immediate_dominator:
+                block.immediate_dominator = dominator
+                changed = True
+
+    cfg.entry.immediate_dominator = None
+    for block in order[1:]:
+        block.immediate_dominator.dominated.append(block)
+
+    # numbers from a walk of the dominator tree, a block dominates the blocks numbered inside its interval
+    counter = 0
+    entered = {}
+    stack = [(cfg.entry, iter(cfg.entry.dominated))]
+    entered[cfg.entry] = counter
+    while stack:
+        block, dominated = stack[-1]
+        child = next(dominated, None)
+        counter += 1
+        if child is None:
+            stack.pop()
+            block.dominator_order = (entered[block], counter)
+        else:
+            entered[child] = counter
+            stack.append((child, iter(child.dominated)))
@@ -0,0 +1,140 @@
+from typing import Optional, Hashable, Iterator
+
+from jaclang.generator import Instruction, Instructions, Registers
+from jaclang.generator.generator import Parameter, RegisterParameter, ValueParameter, LabelParameter
+from jaclang.ir.cfg import ControlFlowGraph
+
+# registers are locations 0 to 7, memory cells the function accesses directly are numbered after them
+REGISTERS = [Registers.RETURN, Registers.REG1, Registers.REG2, Registers.REG3, Registers.REG4, Registers.EXPRESSION,
+             Registers.STACK_BASE, Registers.STACK_TOP]
+# registers a called function may leave anything in
+CLOBBERED_REGISTERS = [Registers.RETURN, Registers.REG1, Registers.REG2, Registers.REG3, Registers.REG4,
+                       Registers.EXPRESSION]
+
+
+# what an instruction does to locations, every set is an int with the bit of each location in it
+class Effects:
+    def __init__(self, uses: int = 0, defs: int = 0, may_defs: int = 0):
+        self.uses = uses
+        # locations always overwritten, their old value is gone afterwards
+        self.defs = defs
+        # locations that may be overwritten, but may also keep their value
+        self.may_defs = may_defs
+
+
+def register_bit(register: RegisterParameter) -> int:
+    return 1 << register.register_number
+
+
+# positions of the set bits, lowest first
+def iterate_bits(bits: int) -> Iterator[int]:
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+# numbers the locations of one function, the stack slots of its frame and memory cells at constant addresses
+# stack slots are only accessed through the frame base, like locals promotion already assumes, while memory cells
+# may also be written through an address computed at runtime
+class LocationTable:
+    def __init__(self, cfg: ControlFlowGraph):
+        self.cfg = cfg
+        self.bits: dict[Hashable, int] = {}
+        self.names = [register.name for register in REGISTERS]
+        self.memory_mask = 0
+        self.stack_mask = 0
+        # jumps to any other label are calls, including the entry of the function itself
+        self.labels = {block.getLabel() for block in cfg.blocks if block.getLabel() is not None}
+        self.labels.discard(cfg.name)
+        self.effects: dict[int, tuple[Instruction, Effects]] = {}
+        # calls that do not come back
+        self.tail_calls: set[Instruction] = set()
+        for block in cfg.blocks:
+            terminator = block.getTerminator()
+            if terminator is not None and self.isCall(terminator) and block.fall_through is None:
+                self.tail_calls.add(terminator)
+        for block in cfg.blocks:
+            for instruction in block.instructions:
+                if type(instruction) in (Instructions.MemRead, Instructions.MemoryWrite):
+                    self.getMemoryBit(instruction.addr, instruction.addr_offset)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # the bit of a memory cell at addr + offset, None if the address is only known at runtime
+    def getMemoryBit(self, addr: Parameter, offset: int) -> Optional[int]:
+        if addr is Registers.STACK_BASE:
+            key = ("stack", offset)
+            name = f"[RBP{offset:+}]"
+        elif type(addr) is ValueParameter:
+            key = ("memory", addr.value + offset)
+            name = f"[{addr.value + offset}]"
+        else:
+            return None
+
+        bit = self.bits.get(key)
+        if bit is None:
+            bit = 1 << len(self.names)
+            self.bits[key] = bit
+            self.names.append(name)
+            if key[0] == "memory":
+                self.memory_mask |= bit
+            else:
+                self.stack_mask |= bit
+        return bit
+
+    def isCall(self, instruction: Instruction) -> bool:
+        return type(instruction) is Instructions.Jump and type(instruction.dest) is LabelParameter and \
+            instruction.dest.label_name not in self.labels
+
+    # analyses ask for the effects of the same instructions many times, the instruction is kept with its effects so
+    # its id is not reused while it is cached
+    def getEffects(self, instruction: Instruction) -> Effects:
+        cached = self.effects.get(id(instruction))
+        if cached is not None:
+            return cached[1]
+        effects = self.computeEffects(instruction)
+        self.effects[id(instruction)] = (instruction, effects)
+        return effects
+
+    def computeEffects(self, instruction: Instruction) -> Effects:
+        effects = Effects()
+        for parameter in instruction.getUsedParameters():
+            if type(parameter) is RegisterParameter:
+                effects.uses |= register_bit(parameter)
+        defined_register = instruction.getDefinedRegister()
+        if defined_register is not None:
+            effects.defs |= register_bit(defined_register)
+
+        instruction_type = type(instruction)
+        if instruction_type is Instructions.MemRead:
+            bit = self.getMemoryBit(instruction.addr, instruction.addr_offset)
+            effects.uses |= bit if bit is not None else self.memory_mask
+        elif instruction_type is Instructions.MemoryWrite:
+            bit = self.getMemoryBit(instruction.addr, instruction.addr_offset)
+            if bit is not None:
+                effects.defs |= bit
+            else:
+                effects.may_defs |= self.memory_mask
+        elif instruction_type in (Instructions.Push, Instructions.Pop):
+            effects.uses |= register_bit(Registers.STACK_TOP)
+            effects.defs |= register_bit(Registers.STACK_TOP)
+        elif instruction in self.tail_calls:
+            # the called function gets the stack and memory and returns in place of this one
+            effects.uses |= register_bit(Registers.STACK_BASE) | register_bit(Registers.STACK_TOP) | self.memory_mask
+        elif self.isCall(instruction):
+            # the called function reads and writes memory and returns with its arguments popped
+            effects.uses |= register_bit(Registers.STACK_TOP) | self.memory_mask
+            effects.defs |= register_bit(Registers.STACK_TOP)
+            for register in CLOBBERED_REGISTERS:
+                effects.defs |= register_bit(register)
+            effects.may_defs |= self.memory_mask
+        elif instruction_type is Instructions.Jump and type(instruction.dest) is RegisterParameter:
+            # returning hands the return value, the stack and memory back to the caller
+            effects.uses |= register_bit(Registers.RETURN) | register_bit(Registers.STACK_BASE) | \
+                register_bit(Registers.STACK_TOP) | self.memory_mask
+        return effects
+
+    def getNames(self, locations: int) -> list[str]:
+        return [self.names[location] for location in iterate_bits(locations)]
@@ -0,0 +1,98 @@
+from jaclang.generator import Instruction, Instructions
+from jaclang.generator.instructions import PURE_INSTRUCTIONS
+from jaclang.ir.analyses import ConstantPropagation
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.dataflow import DataflowAnalysis
+from jaclang.ir.effects import LocationTable, CLOBBERED_REGISTERS, register_bit
+from jaclang.ir.optimizer import IrOptimizer, IrPass
+
+# instructions that can be removed if nothing reads what they write
+REMOVABLE_INSTRUCTIONS = PURE_INSTRUCTIONS + (Instructions.MemoryWrite,)
+# registers that only ever hold values, a called function may leave anything in them
+VALUE_REGISTERS_MASK = sum(register_bit(register) for register in CLOBBERED_REGISTERS)
+
+
+# conditional jumps on a condition known from constant propagation either always jump or never do
+class ConstantBranchPass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        constants = ConstantPropagation(cfg, LocationTable(cfg)).solve()
+        changed = False
+        for block in cfg.blocks:
+            terminator = block.getTerminator()
+            state = constants.block_out[block]
+            if state is None or type(terminator) is not Instructions.Jump or terminator.cond is None or \
+                    block.jump_target is None:
+                continue
+            condition = constants.getValue(state, terminator.cond)
+            if condition is None:
+                continue
+            if condition == 1:
+                block.instructions[-1] = Instructions.Jump(terminator.dest, None)
+                block.fall_through = None
+            else:
+                block.instructions.pop()
+                block.jump_target = None
+            changed = True
+        if changed:
+            cfg.setBlocks(cfg.blocks)
+        return changed
+
+
+# blocks the entry does not reach, like code after a return or behind a branch that is never taken
+class UnreachableBlockPass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        blocks = [block for block in cfg.blocks if block.isReachable()]
+        if len(blocks) == len(cfg.blocks):
+            return False
+        cfg.setBlocks(blocks)
+        return True
+
+
+# locations whose value may still be read by an instruction that is kept, an instruction the dead code pass removes
+# does not make what it reads live, so values only used to compute each other are all found dead in one solve
+class UsefulLiveness(DataflowAnalysis):
+    forward = False
+
+    def __init__(self, cfg: ControlFlowGraph, locations: LocationTable):
+        super().__init__(cfg, locations)
+        # only value registers and stack slots are not seen by anything after the function returns
+        self.removable = VALUE_REGISTERS_MASK | locations.stack_mask
+
+    def isDead(self, instruction: Instruction, live_after: int) -> bool:
+        effects = self.locations.getEffects(instruction)
+        return type(instruction) in REMOVABLE_INSTRUCTIONS and effects.defs != 0 and \
+            not effects.defs & (live_after | ~self.removable)
+
+    def transferInstruction(self, instruction: Instruction, state: int) -> int:
+        if self.isDead(instruction, state):
+            return state
+        effects = self.locations.getEffects(instruction)
+        return (state & ~effects.defs) | effects.uses
+
+
+# instructions whose results are never read by anything that is kept, only ones writing value registers and stack
+# slots are removed, stack slots are not seen by anything after the function returns
+class DeadCodePass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        liveness = UsefulLiveness(cfg, LocationTable(cfg)).solve()
+        removed = False
+        for block in cfg.blocks:
+            live = liveness.block_out[block]
+            kept = []
+            for instruction in reversed(block.instructions):
+                if liveness.isDead(instruction, live):
+                    removed = True
+                    continue
+                live = liveness.transferInstruction(instruction, live)
+                kept.append(instruction)
+            kept.reverse()
+            block.instructions = kept
+        return removed
+
+
+def load():
+    IrOptimizer.passes += [
+        ConstantBranchPass("constant branches"),
+        UnreachableBlockPass("unreachable blocks"),
+        DeadCodePass("dead code"),
+    ]
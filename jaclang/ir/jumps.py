@@ -0,0 +1,153 @@
+from typing import Optional
+
+from jaclang.generator import Instructions
+from jaclang.generator.generator import LabelParameter
+from jaclang.ir.block import BasicBlock
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.optimizer import IrOptimizer, IrPass
+
+
+# the block control goes on to from a block that does nothing else, None if the block does something
+def get_forwarded_block(block: BasicBlock) -> Optional[BasicBlock]:
+    terminator = block.getTerminator()
+    body = block.instructions[:-1] if terminator is not None else block.instructions
+    if any(type(instruction) is not Instructions.Label for instruction in body):
+        return None
+    if terminator is None:
+        return block.fall_through
+    if type(terminator) is Instructions.Jump and terminator.cond is None:
+        return block.jump_target
+    return None
+
+
+# the block a jump to block ends up at after the blocks that only jump on, a loop of them stops at where it closes
+# every block on the way ends up at the same block, so they are remembered in final_targets unless there is a loop
+def get_final_target(block: BasicBlock, final_targets: dict[BasicBlock, BasicBlock]) -> BasicBlock:
+    path = [block]
+    visited = {block}
+    while block not in final_targets:
+        forwarded = get_forwarded_block(block)
+        if forwarded is None or forwarded in visited:
+            if forwarded is None:
+                for passed in path:
+                    final_targets[passed] = block
+            return block
+        path.append(forwarded)
+        visited.add(forwarded)
+        block = forwarded
+    final_target = final_targets[block]
+    for passed in path:
+        final_targets[passed] = final_target
+    return final_target
+
+
+# jumps go straight to where the blocks they jump to would jump on, jumps to the next block and labels nothing
+# jumps to are removed, and blocks falling through to a block nothing else reaches are joined with it
+class JumpThreadingPass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        changed = self.threadJumps(cfg)
+        changed = self.removeUnreachedBlocks(cfg) or changed
+        changed = self.removeJumpsToNext(cfg) or changed
+        changed = self.removeUnusedLabels(cfg) or changed
+        changed = self.joinBlocks(cfg) or changed
+        return changed
+
+    @staticmethod
+    def threadJumps(cfg: ControlFlowGraph) -> bool:
+        changed = False
+        final_targets = {}
+        for block in cfg.blocks:
+            if block.jump_target is None:
+                continue
+            target = get_final_target(block.jump_target, final_targets)
+            if block.fall_through is not None and get_final_target(block.fall_through, final_targets) is target:
+                # both ways end up at the same block, so the condition does not matter
+                block.instructions.pop()
+                block.jump_target = None
+                changed = True
+                continue
+            if target is block.jump_target:
+                continue
+            terminator = block.instructions[-1]
+            block.instructions[-1] = Instructions.Jump(LabelParameter(cfg.requestLabel(target)), terminator.cond)
+            block.jump_target = target
+            changed = True
+        if changed:
+            cfg.setBlocks(cfg.blocks)
+        return changed
+
+    # blocks only the threaded jumps went through, dominators are out of date here so the blocks are walked again
+    @staticmethod
+    def removeUnreachedBlocks(cfg: ControlFlowGraph) -> bool:
+        reached = {cfg.entry}
+        stack = [cfg.entry]
+        while stack:
+            for successor in stack.pop().successors:
+                if successor not in reached:
+                    reached.add(successor)
+                    stack.append(successor)
+        if len(reached) == len(cfg.blocks):
+            return False
+        cfg.setBlocks([block for block in cfg.blocks if block in reached])
+        return True
+
+    # blocks are lowered in order, so a jump to the next block is the same as falling through to it
+    @staticmethod
+    def removeJumpsToNext(cfg: ControlFlowGraph) -> bool:
+        changed = False
+        for block, next_block in zip(cfg.blocks, cfg.blocks[1:]):
+            if block.jump_target is not next_block or \
+                    (block.fall_through is not None and block.fall_through is not next_block):
+                continue
+            block.instructions.pop()
+            block.jump_target = None
+            block.fall_through = next_block
+            changed = True
+        if changed:
+            cfg.setBlocks(cfg.blocks)
+        return changed
+
+    # labels jumped to from other functions are the entries of functions, the ones of calls are pushed
+    @staticmethod
+    def removeUnusedLabels(cfg: ControlFlowGraph) -> bool:
+        used = {cfg.name}
+        for block in cfg.blocks:
+            for instruction in block.instructions:
+                if type(instruction) is Instructions.Jump and type(instruction.dest) is LabelParameter:
+                    used.add(instruction.dest.label_name)
+                elif type(instruction) is Instructions.Push and type(instruction.val) is LabelParameter:
+                    used.add(instruction.val.label_name)
+
+        changed = False
+        for block in cfg.blocks:
+            label = block.getLabel()
+            if label is not None and label not in used:
+                block.instructions.pop(0)
+                changed = True
+        return changed
+
+    # a block without a label can only be reached by falling through to it
+    @staticmethod
+    def joinBlocks(cfg: ControlFlowGraph) -> bool:
+        blocks = []
+        for block in cfg.blocks:
+            previous = blocks[-1] if blocks else None
+            if previous is not None and block.getLabel() is None and previous.fall_through is block and \
+                    previous.getTerminator() is None:
+                previous.instructions += block.instructions
+                previous.fall_through = block.fall_through
+                previous.jump_target = block.jump_target
+                if cfg.exit is block:
+                    cfg.exit = previous
+                continue
+            blocks.append(block)
+        if len(blocks) == len(cfg.blocks):
+            return False
+        cfg.setBlocks(blocks)
+        return True
+
+
+def load():
+    IrOptimizer.passes += [
+        JumpThreadingPass("jump threading"),
+    ]
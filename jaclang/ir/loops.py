@@ -0,0 +1,35 @@
+from jaclang.ir.block import BasicBlock, Loop
+from jaclang.ir.cfg import ControlFlowGraph
+
+
+# natural loops of all back edges, loops with the same header are merged into one
+def find_loops(cfg: ControlFlowGraph) -> list[Loop]:
+    bodies: dict[BasicBlock, set[BasicBlock]] = {}
+    for block in cfg.blocks:
+        block.loop = None
+        if not block.isReachable():
+            continue
+        for successor in block.successors:
+            if not successor.dominates(block):
+                continue
+            # everything that reaches the end of the back edge without passing the header is in the loop
+            body = bodies.setdefault(successor, {successor})
+            stack = [block]
+            while stack:
+                member = stack.pop()
+                if member in body:
+                    continue
+                body.add(member)
+                stack += [predecessor for predecessor in member.predecessors if predecessor.isReachable()]
+
+    loops = [Loop(header, sorted(body, key=lambda member: member.index)) for header, body in bodies.items()]
+    # a loop nested in another one is smaller than it, so the innermost loop of every block is assigned last
+    loops.sort(key=lambda loop: -len(loop.blocks))
+    for loop in loops:
+        loop.parent = loop.header.loop
+        loop.depth = loop.parent.depth + 1 if loop.parent is not None else 1
+        for block in loop.blocks:
+            block.loop = loop
+
+    cfg.loops = loops
+    return loops
@@ -0,0 +1,173 @@
+from typing import Optional, Hashable
+
+from jaclang.generator import Instruction, Instructions, Registers
+from jaclang.generator.generator import Parameter, RegisterParameter, ValueParameter, LabelParameter
+from jaclang.generator.instructions import PURE_INSTRUCTIONS, INSTRUCTION_CYCLES
+from jaclang.ir.analyses import OPERATORS_BY_INSTRUCTION
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.effects import LocationTable, CLOBBERED_REGISTERS, REGISTERS, register_bit, iterate_bits
+from jaclang.ir.optimizer import IrOptimizer, IrPass
+
+# instructions worth replacing by a move, reads from memory become moves so the writes they read may be removed,
+# the other instructions take one cycle like the move
+REPLACED_INSTRUCTIONS = (Instructions.MemRead,) + tuple(INSTRUCTION_CYCLES)
+# the stack registers are only changed by the instructions managing the stack, their values are never reused
+STACK_REGISTERS_MASK = register_bit(Registers.STACK_BASE) | register_bit(Registers.STACK_TOP)
+
+
+# numbers the values of one basic block, instructions computing the same value from the same values get the same
+# number, so a value still held in a register does not have to be computed again
+class ValueTable:
+    def __init__(self, locations: LocationTable):
+        self.locations = locations
+        self.next_number = 0
+        # value number every register holds, a register read before it is written gets a number of its own
+        self.registers: dict[RegisterParameter, int] = {}
+        # value numbers of stack slots and memory cells at constant addresses, by their location bit
+        self.cells: dict[int, int] = {}
+        # value numbers read from addresses only known at runtime, by the number of the address and the offset
+        self.loads: dict[tuple[int, int], int] = {}
+        # value numbers of constants and of computed values, by what they are computed from
+        self.values: dict[Hashable, int] = {}
+        # value numbers pushed in the block, the top last
+        self.stack: list[int] = []
+
+    def newNumber(self) -> int:
+        self.next_number += 1
+        return self.next_number - 1
+
+    def getNumber(self, parameter: Parameter) -> int:
+        if type(parameter) is RegisterParameter:
+            number = self.registers.get(parameter)
+            if number is None:
+                number = self.registers[parameter] = self.newNumber()
+            return number
+        if type(parameter) is ValueParameter:
+            key = ("constant", parameter.value)
+        elif type(parameter) is LabelParameter:
+            key = ("label", parameter.label_name)
+        else:
+            return self.newNumber()
+        number = self.values.get(key)
+        if number is None:
+            number = self.values[key] = self.newNumber()
+        return number
+
+    # a value register already holding the value, the ones expressions use first are preferred
+    def findRegister(self, number: int) -> Optional[RegisterParameter]:
+        for register in CLOBBERED_REGISTERS:
+            if self.registers.get(register) == number:
+                return register
+        return None
+
+    # value number of what a pure instruction writes into its register
+    def getValueNumber(self, instruction: Instruction) -> int:
+        instruction_type = type(instruction)
+        if instruction_type is Instructions.Mov:
+            return self.getNumber(instruction.value)
+        if instruction_type is Instructions.MemRead:
+            bit = self.locations.getMemoryBit(instruction.addr, instruction.addr_offset)
+            if bit is not None:
+                number = self.cells.get(bit)
+                if number is None:
+                    number = self.cells[bit] = self.newNumber()
+                return number
+            key = (self.getNumber(instruction.addr), instruction.addr_offset)
+            number = self.loads.get(key)
+            if number is None:
+                number = self.loads[key] = self.newNumber()
+            return number
+        if instruction_type is Instructions.Not:
+            key = (instruction_type, self.getNumber(instruction.a))
+        else:
+            a = self.getNumber(instruction.a)
+            b = self.getNumber(instruction.b)
+            # operands of commutative operators are ordered, so both orders get the same number
+            if OPERATORS_BY_INSTRUCTION[instruction_type].commutative and b < a:
+                a, b = b, a
+            key = (instruction_type, a, b)
+        number = self.values.get(key)
+        if number is None:
+            number = self.values[key] = self.newNumber()
+        return number
+
+    def write(self, instruction: Instruction):
+        value = self.getNumber(instruction.value)
+        bit = self.locations.getMemoryBit(instruction.addr, instruction.addr_offset)
+        if bit is not None:
+            if bit & self.locations.memory_mask:
+                self.loads.clear()
+            self.cells[bit] = value
+            return
+        # the address may be the one of any memory cell
+        address = self.getNumber(instruction.addr)
+        self.forgetMemory()
+        self.loads[(address, instruction.addr_offset)] = value
+
+    def forgetMemory(self):
+        self.loads.clear()
+        for bit in list(self.cells):
+            if bit & self.locations.memory_mask:
+                del self.cells[bit]
+
+    # anything else gets new values in the locations it writes
+    def forget(self, instruction: Instruction):
+        effects = self.locations.getEffects(instruction)
+        written = effects.defs | effects.may_defs
+        for location in iterate_bits(written & ((1 << len(REGISTERS)) - 1)):
+            self.registers[REGISTERS[location]] = self.newNumber()
+        for bit in list(self.cells):
+            if bit & written:
+                del self.cells[bit]
+        if self.locations.isCall(instruction):
+            # a called function may write any memory cell
+            self.forgetMemory()
+        if written & register_bit(Registers.STACK_TOP):
+            self.stack.clear()
+
+
+# instructions computing a value that is still in a register are removed if it is already in the register they
+# write, or become moves from the register holding it, which later passes can often remove
+class ValueNumberingPass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        locations = LocationTable(cfg)
+        changed = False
+        for block in cfg.blocks:
+            table = ValueTable(locations)
+            instructions = []
+            for instruction in block.instructions:
+                instruction_type = type(instruction)
+                if instruction_type in PURE_INSTRUCTIONS and \
+                        not register_bit(instruction.reg_save) & STACK_REGISTERS_MASK:
+                    number = table.getValueNumber(instruction)
+                    # moves between registers are left for the peephole optimizer, which can often write the value
+                    # straight into the register it is moved to instead
+                    if table.registers.get(instruction.reg_save) == number and \
+                            not (instruction_type is Instructions.Mov and type(instruction.value) is RegisterParameter):
+                        changed = True
+                        continue
+                    register = table.findRegister(number)
+                    if register is not None and instruction_type in REPLACED_INSTRUCTIONS:
+                        instruction = Instructions.Mov(register, instruction.reg_save)
+                        changed = True
+                    table.registers[instruction.reg_save] = number
+                elif instruction_type is Instructions.MemoryWrite:
+                    table.write(instruction)
+                elif instruction_type is Instructions.Push:
+                    table.stack.append(table.getNumber(instruction.val))
+                    table.registers[Registers.STACK_TOP] = table.newNumber()
+                elif instruction_type is Instructions.Pop:
+                    number = table.stack.pop() if table.stack else table.newNumber()
+                    table.registers[Registers.STACK_TOP] = table.newNumber()
+                    table.registers[instruction.reg] = number
+                else:
+                    table.forget(instruction)
+                instructions.append(instruction)
+            block.instructions = instructions
+        return changed
+
+
+def load():
+    IrOptimizer.passes += [
+        ValueNumberingPass("value numbering"),
+    ]
@@ -0,0 +1,69 @@
+from abc import abstractmethod
+from typing import Iterable, Iterator
+
+from jaclang.generator import Instruction
+from jaclang.generator.generator import INSTRUCTION_BYTES
+from jaclang.generator.promotion import promote_function
+from jaclang.ir.analyses import print_analyses
+from jaclang.ir.cfg import ControlFlowGraph, split_functions, get_function_name, build_cfg
+from jaclang.ir.dominators import compute_dominators
+from jaclang.ir.loops import find_loops
+
+
+class IrPass:
+    def __init__(self, name: str):
+        self.name = name
+
+    # changes the graph in place and returns whether it changed anything, dominators and loops are up to date when
+    # a pass begins
+    @abstractmethod
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        pass
+
+
+class IrOptimizer:
+    passes: list[IrPass] = []
+
+    def __init__(self, debug_output: bool = False, debug_dataflow: bool = False):
+        self.debug_output = debug_output
+        self.debug_dataflow = debug_dataflow
+        # instructions every pass removed, passes that add instructions have negative counts
+        self.removed = {ir_pass.name: 0 for ir_pass in self.passes}
+
+    # every function is turned into a control flow graph, optimized and lowered back, the start code is left as it is
+    def optimize(self, instructions: Iterable[Instruction]) -> Iterator[Instruction]:
+        for chunk in split_functions(instructions):
+            if get_function_name(chunk) is not None:
+                chunk = self.optimizeFunction(chunk)
+            yield from chunk
+
+    # locals are promoted to registers before the function is turned into a control flow graph
+    def optimizeFunction(self, chunk: list[Instruction]) -> list[Instruction]:
+        cfg = build_cfg(promote_function(chunk))
+        self.analyze(cfg)
+        for ir_pass in self.passes:
+            num_instructions = cfg.countInstructions()
+            if ir_pass.run(cfg):
+                self.analyze(cfg)
+                self.removed[ir_pass.name] += num_instructions - cfg.countInstructions()
+
+        if self.debug_output:
+            cfg.printInfo()
+        if self.debug_dataflow:
+            print_analyses(cfg)
+        return cfg.lower()
+
+    # functions whose code generation left out are counted there, by the instructions in their bodies
+    def printStats(self, removed_functions: int = 0, removed_function_instructions: int = 0):
+        print("IR optimizer:")
+        print("---------------------------------")
+        for name, removed in self.removed.items():
+            print(f"{name}: {removed} instructions, {removed * INSTRUCTION_BYTES} bytes removed")
+        print(f"unused functions: {removed_functions} functions, {removed_function_instructions} instructions, "
+              f"{removed_function_instructions * INSTRUCTION_BYTES} bytes removed")
+        print("---------------------------------")
+
+    @staticmethod
+    def analyze(cfg: ControlFlowGraph):
+        compute_dominators(cfg)
+        find_loops(cfg)
@@ -0,0 +1,129 @@
+from typing import Optional
+
+from jaclang.generator import Instruction, Instructions
+from jaclang.generator.generator import RegisterParameter, ValueParameter
+from jaclang.generator.instructions import INSTRUCTION_CYCLES, UNSIGNED_DIVISION
+from jaclang.ir.analyses import Liveness
+from jaclang.ir.cfg import ControlFlowGraph
+from jaclang.ir.effects import LocationTable, CLOBBERED_REGISTERS, register_bit
+from jaclang.ir.optimizer import IrOptimizer, IrPass
+
+REDUCED_INSTRUCTIONS = (Instructions.Multiply, Instructions.Divide, Instructions.Modulo)
+
+
+def get_cycles(instructions: list[Instruction]) -> int:
+    return sum(INSTRUCTION_CYCLES.get(type(instruction), 1) for instruction in instructions)
+
+
+def is_power_of_two(value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+# shift and add sequences that multiply value by constant, temp is a register that may be overwritten or None
+def multiply_sequences(value: RegisterParameter, constant: int, result: RegisterParameter,
+                       temp: Optional[RegisterParameter]) -> list[list[Instruction]]:
+    sequences = []
+    if is_power_of_two(constant):
+        sequences.append([Instructions.BitShiftLeft(value, ValueParameter(constant.bit_length() - 1), result)])
+
+    # the shifted value is kept in result if that does not overwrite value before it is added
+    shifted = result if result is not value else temp
+    if shifted is None:
+        return sequences
+    if is_power_of_two(constant - 1) and constant > 2:
+        sequences.append([
+            Instructions.BitShiftLeft(value, ValueParameter((constant - 1).bit_length() - 1), shifted),
+            Instructions.Add(shifted, value, result),
+        ])
+    if is_power_of_two(constant + 1) and constant > 2:
+        sequences.append([
+            Instructions.BitShiftLeft(value, ValueParameter((constant + 1).bit_length() - 1), shifted),
+            Instructions.Subtract(shifted, value, result),
+        ])
+
+    # two set bits, value is shifted into the temporary first, so result may be value
+    lowest = constant & -constant
+    if temp is not None and lowest > 1 and is_power_of_two(constant - lowest):
+        sequences.append([
+            Instructions.BitShiftLeft(value, ValueParameter((constant - lowest).bit_length() - 1), temp),
+            Instructions.BitShiftLeft(value, ValueParameter(lowest.bit_length() - 1), result),
+            Instructions.Add(temp, result, result),
+        ])
+    return sequences
+
+
+# multiplications, divisions and remainders by constants are done with shifts, adds and masks where the cycle table
+# says that is faster, divisions and remainders only if the target divides unsigned words
+class StrengthReductionPass(IrPass):
+    def run(self, cfg: ControlFlowGraph) -> bool:
+        if not any(type(instruction) in REDUCED_INSTRUCTIONS and
+                   (type(instruction.a) is ValueParameter or type(instruction.b) is ValueParameter)
+                   for block in cfg.blocks for instruction in block.instructions):
+            return False
+
+        locations = LocationTable(cfg)
+        liveness = Liveness(cfg, locations).solve()
+        changed = False
+        for block in cfg.blocks:
+            instructions = []
+            for instruction, _, live_after in liveness.getInstructionStates(block):
+                replacement = None
+                if type(instruction) in REDUCED_INSTRUCTIONS:
+                    previous = instructions[-1] if instructions else None
+                    replacement = self.reduce(instruction, live_after, previous)
+                if replacement is None:
+                    instructions.append(instruction)
+                    continue
+                changed = True
+                if replacement[0] is previous:
+                    # the copy the operation was done on is not needed anymore
+                    instructions.pop()
+                    del replacement[0]
+                instructions += replacement
+            block.instructions = instructions
+        return changed
+
+    # previous is the instruction before it, if it copies the register the operation is done on in place, the
+    # sequence is done on the original register and begins with the copy, which is then dropped
+    def reduce(self, instruction: Instruction, live_after: int,
+               previous: Optional[Instruction]) -> Optional[list[Instruction]]:
+        value, constant = instruction.a, instruction.b
+        if type(instruction) is Instructions.Multiply and type(value) is ValueParameter:
+            value, constant = constant, value
+        if type(value) is not RegisterParameter or type(constant) is not ValueParameter:
+            return None
+        result = instruction.reg_save
+
+        copied = type(previous) is Instructions.Mov and previous.reg_save is value and value is result and \
+            type(previous.value) is RegisterParameter and previous.value in CLOBBERED_REGISTERS
+        if copied:
+            value = previous.value
+
+        if type(instruction) is Instructions.Multiply:
+            sequences = multiply_sequences(value, constant.value, result,
+                                           self.getTemporary(instruction, live_after, value))
+        elif not UNSIGNED_DIVISION or not is_power_of_two(constant.value):
+            return None
+        elif type(instruction) is Instructions.Divide:
+            sequences = [[Instructions.BitShiftRight(value, ValueParameter(constant.value.bit_length() - 1), result)]]
+        else:
+            sequences = [[Instructions.And(value, ValueParameter(constant.value - 1), result)]]
+
+        best = min(sequences, key=get_cycles, default=None)
+        if best is None or get_cycles(best) >= get_cycles([instruction]):
+            return None
+        return [previous] + best if copied else best
+
+    # a value register nothing reads before it is written again, that neither the instruction nor value use
+    @staticmethod
+    def getTemporary(instruction: Instruction, live_after: int,
+                     value: RegisterParameter) -> Optional[RegisterParameter]:
+        for register in CLOBBERED_REGISTERS:
+            if not register_bit(register) & live_after and not instruction.usesRegister(register) and \
+                    instruction.reg_save is not register and register is not value:
+                return register
+        return None
+
+
+def load():
+    IrOptimizer.passes.append(StrengthReductionPass("strength reduction"))
@@ -1,151 +1,156 @@
-from abc import abstractmethod
-from copy import copy
+import re
+from array import array
 
 from jaclang.preprocessor.preprocessor import PREPROCESSOR_WHITESPACE
 
 
-class Token:
-    def __init__(self):
-        self.pos = -1
-
-    @abstractmethod
-    def getInfo(self) -> str:
-        pass
-
+# token kinds are plain integers, so the parser compares tokens without touching any token object
+class TokenKind(int):
+    kinds: list["TokenKind"] = []
 
-class SymbolToken(Token):
-    symbols = []
-
-    def __init__(self, name: str, identifier: str):
-        super().__init__()
-        self.name = name
-        self.identifier = identifier
-        SymbolToken.symbols.append(self)
+    def __new__(cls, name: str):
+        kind = super().__new__(cls, len(TokenKind.kinds))
+        kind.name = name
+        TokenKind.kinds.append(kind)
+        return kind
 
     def getInfo(self) -> str:
         return self.name
 
-    def __hash__(self):
-        return self.identifier.__hash__()
-
-    def __eq__(self, other):
-        if type(other) is not SymbolToken:
-            return False
-        return self.identifier == other.identifier
 
+class SymbolKind(TokenKind):
+    symbols: list["SymbolKind"] = []
 
-class IdentifierToken(Token):
-    def __init__(self, identifier: str):
-        super().__init__()
-        self.identifier = identifier
+    def __new__(cls, name: str, identifier: str):
+        kind = super().__new__(cls, name)
+        kind.identifier = identifier
+        SymbolKind.symbols.append(kind)
+        return kind
 
-    def getInfo(self) -> str:
-        return f"ident: {self.identifier}"
 
-    def __hash__(self):
-        return self.identifier.__hash__()
+class KeywordKind(TokenKind):
+    keywords: dict[str, "KeywordKind"] = {}
 
-    def __eq__(self, other):
-        if type(other) is not IdentifierToken:
-            return False
-        return self.identifier == other.identifier
+    def __new__(cls, name: str, identifier: str):
+        kind = super().__new__(cls, name)
+        kind.identifier = identifier
+        KeywordKind.keywords[identifier] = kind
+        return kind
 
 
-class ConstantToken(Token):
-    def __init__(self, value: int):
-        super().__init__()
-        self.value = value
+class TokenKinds:
+    END = TokenKind("END")
+    IDENTIFIER = TokenKind("IDENTIFIER")
+    CONSTANT = TokenKind("CONSTANT")
 
-    def getInfo(self) -> str:
-        return f"value: {self.value}"
 
-    def __hash__(self):
-        return self.value.__hash__()
-
-    def __eq__(self, other):
-        if type(other) is not ConstantToken:
-            return False
-        return self.value == other.value
-
-
-class KeywordToken(Token):
-    keywords = {}
-
-    def __init__(self, name: str, identifier: str):
-        super().__init__()
-        self.name = name
-        self.identifier = identifier
-        KeywordToken.keywords[identifier] = self
-
-    def getInfo(self) -> str:
-        return self.name
-
-    def __hash__(self):
-        return self.identifier.__hash__()
-
-    def __eq__(self, other):
-        if type(other) is not KeywordToken:
-            return False
-        return self.identifier == other.identifier
-
-
-class EndToken(Token):
+class TokenStream:
     def __init__(self):
-        super().__init__()
-
-    def getInfo(self) -> str:
-        return "END"
-
-    def __hash__(self):
-        return "EndToken".__hash__()
-
-    def __eq__(self, other):
-        return type(other) is EndToken
+        self.kinds = array("i")
+        self.positions = array("i")
+        # index into strings for identifiers and into constants for constants
+        self.payloads = array("i")
+        self.strings: list[str] = []
+        self.constants: list[int] = []
+        self.string_ids: dict[str, int] = {}
+        self.constant_ids: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> int:
+        return self.kinds[index]
+
+    def append(self, kind: int, pos: int, payload: int = -1):
+        self.kinds.append(kind)
+        self.positions.append(pos)
+        self.payloads.append(payload)
+
+    def appendIdentifier(self, identifier: str, pos: int):
+        string_id = self.string_ids.get(identifier)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.string_ids[identifier] = string_id
+            self.strings.append(identifier)
+        self.append(TokenKinds.IDENTIFIER, pos, string_id)
+
+    def appendConstant(self, value: int, pos: int):
+        constant_id = self.constant_ids.get(value)
+        if constant_id is None:
+            constant_id = len(self.constants)
+            self.constant_ids[value] = constant_id
+            self.constants.append(value)
+        self.append(TokenKinds.CONSTANT, pos, constant_id)
+
+    def getPos(self, index: int) -> int:
+        return self.positions[index]
+
+    def getIdentifier(self, index: int) -> str:
+        return self.strings[self.payloads[index]]
+
+    def getValue(self, index: int) -> int:
+        return self.constants[self.payloads[index]]
+
+    def getInfo(self, index: int) -> str:
+        kind = self.kinds[index]
+        if kind == TokenKinds.IDENTIFIER:
+            return f"ident: {self.getIdentifier(index)}"
+        elif kind == TokenKinds.CONSTANT:
+            return f"value: {self.getValue(index)}"
+        else:
+            return TokenKind.kinds[kind].getInfo()
 
 
 class Symbols:
     # Operators
-    BIT_SHIFT_LEFT = SymbolToken("BIT_SHIFT_LEFT", "<<")
-    BIT_SHIFT_RIGHT = SymbolToken("BIT_SHIFT_LEFT", ">>")
-    OR = SymbolToken("OR", "|")
-    XOR = SymbolToken("XOR", "^")
-    AND = SymbolToken("AND", "&")
-    INCREMENT = SymbolToken("INCREMENT", "++")
-    DECREMENT = SymbolToken("DECREMENT", "--")
-    INCREMENT_BY = SymbolToken("INCREMENT_BY", "+=")
-    DECREMENT_BY = SymbolToken("DECREMENT_BY", "-=")
-    PLUS = SymbolToken("PLUS", "+")
-    MINUS = SymbolToken("MINUS", "-")
-    MULTIPLY = SymbolToken("MULTIPLY", "*")
-    DIVIDE = SymbolToken("DIVIDE", "/")
-    MODULO = SymbolToken("MODULO", "%")
+    BIT_SHIFT_LEFT = SymbolKind("BIT_SHIFT_LEFT", "<<")
+    BIT_SHIFT_RIGHT = SymbolKind("BIT_SHIFT_LEFT", ">>")
+    OR = SymbolKind("OR", "|")
+    XOR = SymbolKind("XOR", "^")
+    AND = SymbolKind("AND", "&")
+    INCREMENT = SymbolKind("INCREMENT", "++")
+    DECREMENT = SymbolKind("DECREMENT", "--")
+    INCREMENT_BY = SymbolKind("INCREMENT_BY", "+=")
+    DECREMENT_BY = SymbolKind("DECREMENT_BY", "-=")
+    PLUS = SymbolKind("PLUS", "+")
+    MINUS = SymbolKind("MINUS", "-")
+    MULTIPLY = SymbolKind("MULTIPLY", "*")
+    DIVIDE = SymbolKind("DIVIDE", "/")
+    MODULO = SymbolKind("MODULO", "%")
 
     # Comparisons
-    EQUALS = SymbolToken("EQUALS", "==")
-    LESS_OR_EQUAL_THAN = SymbolToken("LESS_OR_EQUAL_THAN", "<=")
-    GREATER_OR_EQUAL_THAN = SymbolToken("GREATER_OR_EQUAL_THAN", ">=")
-    NOT_EQUAL = SymbolToken("NOT_EQUAL", "!=")
-    ASSIGNMENT = SymbolToken("ASSIGNMENT", "=")
-    LESS_THAN = SymbolToken("LESS_THAN", "<")
-    GREATER_THAN = SymbolToken("GREATER_THAN", ">")
+    EQUALS = SymbolKind("EQUALS", "==")
+    LESS_OR_EQUAL_THAN = SymbolKind("LESS_OR_EQUAL_THAN", "<=")
+    GREATER_OR_EQUAL_THAN = SymbolKind("GREATER_OR_EQUAL_THAN", ">=")
+    NOT_EQUAL = SymbolKind("NOT_EQUAL", "!=")
+    ASSIGNMENT = SymbolKind("ASSIGNMENT", "=")
+    LESS_THAN = SymbolKind("LESS_THAN", "<")
+    GREATER_THAN = SymbolKind("GREATER_THAN", ">")
 
     # Symbols
-    LEFT_BRACKET = SymbolToken("LEFT_BRACKET", "(")
-    RIGHT_BRACKET = SymbolToken("RIGHT_BRACKET", ")")
-    LEFT_BRACE = SymbolToken("LEFT_BRACE", "{")
-    RIGHT_BRACE = SymbolToken("RIGHT_BRACE", "}")
-    SQUARE_LEFT_BRACKET = SymbolToken("SQUARE_LEFT_BRACKET", "[")
-    SQUARE_RIGHT_BRACKET = SymbolToken("SQUARE_RIGHT_BRACKET", "]")
+    LEFT_BRACKET = SymbolKind("LEFT_BRACKET", "(")
+    RIGHT_BRACKET = SymbolKind("RIGHT_BRACKET", ")")
+    LEFT_BRACE = SymbolKind("LEFT_BRACE", "{")
+    RIGHT_BRACE = SymbolKind("RIGHT_BRACE", "}")
+    SQUARE_LEFT_BRACKET = SymbolKind("SQUARE_LEFT_BRACKET", "[")
+    SQUARE_RIGHT_BRACKET = SymbolKind("SQUARE_RIGHT_BRACKET", "]")
 
 
 class Keywords:
-    FUNC = KeywordToken("FUNC", "func")
-    IF = KeywordToken("IF", "if")
-    WHILE = KeywordToken("WHILE", "while")
-    VAR = KeywordToken("VAR", "var")
-    RETURN = KeywordToken("RETURN", "return")
-    WRITE = KeywordToken("WRITE", "write")
-    RECV_KEY = KeywordToken("RECV_KEY", "receive_key")
+    FUNC = KeywordKind("FUNC", "func")
+    IF = KeywordKind("IF", "if")
+    WHILE = KeywordKind("WHILE", "while")
+    VAR = KeywordKind("VAR", "var")
+    RETURN = KeywordKind("RETURN", "return")
+    WRITE = KeywordKind("WRITE", "write")
+    RECV_KEY = KeywordKind("RECV_KEY", "receive_key")
+
+
+NUMBER_PATTERN = re.compile(
+    r"0b(?P<bin>\s*(?:0[bB]_?)?[01]+(?:_[01]+)*\s*)"
+    r"|0x(?P<hex>\s*(?:0[xX]_?)?[\da-fA-F]+(?:_[\da-fA-F]+)*\s*)"
+    r"|(?P<dec>\s*\d+(?:_\d+)*\s*)"
+)
 
 
 def parse_number(string: str) -> int:
@@ -158,62 +163,71 @@ def parse_number(string: str) -> int:
 
 
 def is_number(string: str) -> bool:
-    try:
-        parse_number(string)
-        return True
-    except ValueError:
-        return False
-
-
-def tokenize(code: str, debug_output: bool = False) -> list[Token]:
-    tokens = []
-    curr_token = ""
-
-    i = 0
-    while i < len(code):
-        curr_symbol = None
-        for symbol in SymbolToken.symbols:
-            if symbol.identifier != "" and code.startswith(symbol.identifier, i):
-                curr_symbol = copy(symbol)
-                break
-
-        if code[i] == PREPROCESSOR_WHITESPACE or curr_symbol is not None or (
-                len(code) > i + 2 and code[i] == "'" and code[i + 2] == "'"):
-            if curr_token != "":
-                if is_number(curr_token):
-                    new_token = ConstantToken(parse_number(curr_token))
-                elif curr_token in KeywordToken.keywords.keys():
-                    new_token = KeywordToken.keywords[curr_token]
-                else:
-                    new_token = IdentifierToken(curr_token)
-                new_token.pos = i - len(curr_token)
-                curr_token = ""
-                tokens.append(new_token)
-
-            if code[i] == PREPROCESSOR_WHITESPACE:
-                i += 1
-
-            if len(code) > i + 2 and code[i] == "'" and code[i + 2] == "'":
-                new_token = ConstantToken(ord(code[i + 1]))
-                new_token.pos = i
-                tokens.append(new_token)
-                i += 3
-
-            if curr_symbol is not None:
-                curr_symbol.pos = i
-                tokens.append(curr_symbol)
-                i += len(curr_symbol.identifier)
-        else:
-            curr_token += code[i]
-            i += 1
+    return NUMBER_PATTERN.fullmatch(string) is not None
+
 
-    end_token = EndToken()
-    end_token.pos = len(code)
-    tokens.append(end_token)
+def number_value(match: re.Match) -> int:
+    if match.group("bin") is not None:
+        return int(match.group("bin"), 2)
+    elif match.group("hex") is not None:
+        return int(match.group("hex"), 16)
+    else:
+        return int(match.group("dec"))
+
+
+def build_token_pattern() -> re.Pattern:
+    # symbols are matched in the order they were declared, the same way the old per-character scan did
+    symbols = [symbol.identifier for symbol in SymbolKind.symbols if symbol.identifier != ""]
+
+    # a character belongs to a word unless whitespace, a character literal or a symbol starts at it
+    word_parts = ["'(?!.')"]
+    excluded_chars = {PREPROCESSOR_WHITESPACE, "'"}
+    for first_char in sorted({symbol[0] for symbol in symbols}):
+        excluded_chars.add(first_char)
+        if first_char not in symbols:
+            rests = "|".join(re.escape(symbol[1:]) for symbol in symbols if symbol[0] == first_char)
+            word_parts.append(f"{re.escape(first_char)}(?!{rests})")
+    word_parts.insert(0, "[^" + "".join(re.escape(char) for char in sorted(excluded_chars)) + "]+")
+
+    # the alternatives can never match at the same position, so the most common ones go first
+    return re.compile(
+        f"{re.escape(PREPROCESSOR_WHITESPACE)}+"
+        f"|(?P<word>(?:{'|'.join(word_parts)})+)"
+        f"|(?P<symbol>{'|'.join(re.escape(symbol) for symbol in symbols)})"
+        f"|'(?P<char>.)'",
+        re.DOTALL
+    )
+
+
+TOKEN_PATTERN = build_token_pattern()
+
+
+def tokenize(code: str, debug_output: bool = False) -> TokenStream:
+    tokens = TokenStream()
+    symbols = {symbol.identifier: symbol for symbol in reversed(SymbolKind.symbols)}
+    keywords = KeywordKind.keywords
+
+    for match in TOKEN_PATTERN.finditer(code):
+        kind = match.lastgroup
+        if kind == "word":
+            word = match.group()
+            number = NUMBER_PATTERN.fullmatch(word)
+            if number is not None:
+                tokens.appendConstant(number_value(number), match.start())
+            elif word in keywords:
+                tokens.append(keywords[word], match.start())
+            else:
+                tokens.appendIdentifier(word, match.start())
+        elif kind == "symbol":
+            tokens.append(symbols[match.group()], match.start())
+        elif kind == "char":
+            tokens.appendConstant(ord(match.group("char")), match.start())
+
+    tokens.append(TokenKinds.END, len(code))
     if debug_output:
         print("Generated tokens:")
         print("---------------------------------")
-        for token in tokens:
-            print(token.getInfo())
+        for i in range(len(tokens)):
+            print(tokens.getInfo(i))
         print("---------------------------------")
     return tokens
@@ -1,5 +1,8 @@
+from typing import Iterator, Optional
+
+from jaclang.error.syntax_error import ErrorCollector
 from jaclang.generator import Instruction
-from jaclang.lexer import Token
+from jaclang.lexer import TokenStream
 from jaclang.parser import expression
 from jaclang.parser import function
 # modules
@@ -10,7 +13,10 @@ from jaclang.parser import scope
 from jaclang.parser import variable
 from jaclang.parser import receive_key
 from jaclang.parser.expression import ValueFactory
-from jaclang.parser.root import RootFactory
+from jaclang.parser.function.call_graph import CallGraph
+from jaclang.parser.function.inliner import Inliner
+from jaclang.parser.root import RootFactory, RemovedFunctions
+from jaclang.parser.scope import BranchInScopeFactory, PackratCache
 
 while_statement.load()
 if_statement.load()
@@ -23,10 +29,28 @@ receive_key.load()
 expression.load()
 
 
-def parse(tokens: list[Token], debug_output: bool = False) -> list[Instruction]:
+# if errors is given, parsing and generation go on after recoverable errors and report them there
+# inline_budget is how many instructions inlining small functions may add, None turns inlining off
+def parse(tokens: TokenStream, debug_output: bool = False, packrat: bool = False, debug_packrat: bool = False,
+          errors: Optional[ErrorCollector] = None, inline_budget: Optional[int] = None,
+          removed_functions: Optional[RemovedFunctions] = None) -> Iterator[Instruction]:
     root_factory = RootFactory()
 
-    _, root_branch = root_factory.parse(0, tokens)
+    packrat_cache = PackratCache() if packrat or debug_packrat else None
+    BranchInScopeFactory.packrat_cache = packrat_cache
+    BranchInScopeFactory.error_collector = errors
+    try:
+        _, root_branch = root_factory.parse(0, tokens, errors)
+    finally:
+        BranchInScopeFactory.packrat_cache = None
+        BranchInScopeFactory.error_collector = None
+
+    if debug_packrat:
+        packrat_cache.printStats()
+
+    # the tree of a program with syntax errors is incomplete, so it is not generated
+    if errors is not None:
+        errors.raiseErrors()
 
     if debug_output:
         print("Generated abstract syntax tree:")
@@ -34,4 +58,10 @@ def parse(tokens: list[Token], debug_output: bool = False) -> list[Instruction]:
         root_branch.printInfo(0)
         print("---------------------------------")
 
-    return root_branch.generateInstructions()
+    # which functions are emitted is decided before their callers are generated, so no function code is held back
+    call_graph = CallGraph(tokens)
+    inliner = None
+    if inline_budget is not None:
+        inliner = Inliner(call_graph, inline_budget)
+
+    return root_branch.generateInstructions(errors, inliner, call_graph.findUsedFunctions(), removed_functions)
@@ -1,56 +1,247 @@
+from typing import Optional, Union, Iterator
+
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.lexer import Token
+from jaclang.generator.generator import RegisterParameter, ValueParameter
+from jaclang.lexer import TokenStream, Symbols
 from jaclang.parser.expression.operators import Operator
-from jaclang.parser.expression.value import ValueBranch, ValueFactory
-from jaclang.parser.scope import ScopeContext, BranchInScopeFactory, BranchInScope, TokenExpectedException
+from jaclang.parser.expression.value import ValueBranch, ValueFactory, TEMPORARY_REGISTERS
+from jaclang.parser.integer import IntegerBranch
+from jaclang.parser.scope import ScopeContext, BranchInScopeFactory, BranchInScope, TokenExpectedException, \
+    TokenNeededException, Nested, flattenNested
 
 
 class ExpressionBranch(ValueBranch):
     def __init__(self, value1: ValueBranch, expr_operator: Operator, value2: ValueBranch):
+        # a constant operand is given to the operator as an immediate, on the right if the operator is commutative
+        if expr_operator.commutative and type(value1) is IntegerBranch and type(value2) is not IntegerBranch:
+            value1, value2 = value2, value1
         self.value1 = value1
         self.value2 = value2
         self.expr_operator = expr_operator
 
+        # labels are computed once from the operands, so generating never has to walk the tree
+        self.side_effects = value1.hasSideEffects() or value2.hasSideEffects()
+        self.clobbers = value1.clobbersRegisters() or value2.clobbersRegisters()
+        if type(value2) is IntegerBranch:
+            self.immediate = value2
+        elif type(value1) is IntegerBranch:
+            self.immediate = value1
+        else:
+            self.immediate = None
+
+        if self.immediate is not None:
+            self.swapped = self.immediate is value1
+            self.register_need = (value2 if self.swapped else value1).getRegisterNeed()
+            return
+        # Sethi-Ullman order: the operand needing more registers goes first, if the operands may be swapped
+        need = self.getOperandsNeed(value1, value2)
+        swapped_need = self.getOperandsNeed(value2, value1)
+        self.swapped = not self.side_effects and swapped_need < need
+        self.register_need = swapped_need if self.swapped else need
+
+    @staticmethod
+    def getOperandsNeed(first: ValueBranch, second: ValueBranch) -> int:
+        # the value of first is held in a register while second is generated, unless second is loaded last
+        if second.isLoadable():
+            return first.getRegisterNeed()
+        return max(first.getRegisterNeed(), second.getRegisterNeed() + 1)
+
+    def getRegisterNeed(self) -> int:
+        return self.register_need
+
+    def hasSideEffects(self) -> bool:
+        return self.side_effects
+
+    def clobbersRegisters(self) -> bool:
+        return self.clobbers
+
     def printInfo(self, nested_level: int):
-        self.value1.printInfo(nested_level)
+        for _ in flattenNested(self.printNestedInfo(nested_level)):
+            pass
+
+    def printNestedInfo(self, nested_level: int) -> Iterator:
+        yield Nested(self.value1.printNestedInfo(nested_level))
         print('    ' * nested_level, self.expr_operator.name)
-        self.value2.printInfo(nested_level)
+        yield Nested(self.value2.printNestedInfo(nested_level))
+
+    def generateInstructions(self, context: ScopeContext) -> Iterator[Instruction]:
+        return flattenNested(self.generateNestedInstructions(context), context.errors)
+
+    def generateNestedInstructions(self, context: ScopeContext) -> Iterator:
+        return self.generateNestedValue(context, TEMPORARY_REGISTERS)
+
+    # a comparison is inverted instead of jumping over a jump
+    def generateJump(self, context: ScopeContext, label: str, jump_if: bool) -> Iterator[Instruction]:
+        loop_value = context.loop_values.get(self)
+        if loop_value is not None:
+            yield from loop_value.generateJump(context, label, jump_if)
+            return
+        if jump_if or self.expr_operator.inverse is None:
+            yield from super().generateJump(context, label, jump_if)
+            return
+        inverted = ExpressionBranch(self.value1, self.expr_operator.inverse, self.value2)
+        yield from inverted.generateJump(context, label, True)
+
+    def generateNestedValue(self, context: ScopeContext, free_registers: list[RegisterParameter]) -> Iterator:
+        loop_value = context.loop_values.get(self)
+        if loop_value is not None:
+            yield Nested(loop_value.generateNestedValue(context, free_registers))
+            return
+        first, second = (self.value2, self.value1) if self.swapped else (self.value1, self.value2)
+        yield Nested(first.generateNestedValue(context, free_registers))
+
+        if second is self.immediate:
+            second.generateDiscarded(context)
+            first_register = Registers.RETURN
+            second_register = ValueParameter(second.value)
+        elif second.isLoadable():
+            # EXPRESSION is only needed until the operator is applied
+            first_register = Registers.RETURN
+            second_register = Registers.EXPRESSION
+            yield from second.generateInstructionsInto(context, second_register)
+        elif second.clobbersRegisters() or not free_registers:
+            first_register = Registers.EXPRESSION
+            second_register = Registers.RETURN
+            yield Instructions.Push(Registers.RETURN)
+            yield Nested(second.generateNestedValue(context, free_registers))
+            yield Instructions.Pop(Registers.EXPRESSION)
+        else:
+            first_register = free_registers[0]
+            second_register = Registers.RETURN
+            yield Instructions.Mov(Registers.RETURN, first_register)
+            yield Nested(second.generateNestedValue(context, free_registers[1:]))
+
+        if self.swapped:
+            yield from self.expr_operator.generateInstructions(second_register, first_register)
+        else:
+            yield from self.expr_operator.generateInstructions(first_register, second_register)
+
+
+def isConstant(value: ValueBranch, constant: Optional[int]) -> bool:
+    return type(value) is IntegerBranch and value.value == constant and not value.discarded
 
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        instructions = []
 
-        instructions += self.value1.generateInstructions(context)
-        instructions += [
-            Instructions.Mov(Registers.RETURN, Registers.EXPRESSION),
-            Instructions.Push(Registers.EXPRESSION),
-        ]
-        instructions += self.value2.generateInstructions(context)
-        instructions += [
-            Instructions.Pop(Registers.EXPRESSION),
-        ]
+# applies the operator right away if both operands are constants and leaves out operands that do not change the
+# result, operands with side effects are never left out
+def foldExpression(value1: ValueBranch, expr_operator: Operator, value2: ValueBranch) -> ValueBranch:
+    if type(value1) is IntegerBranch and type(value2) is IntegerBranch:
+        result = expr_operator.fold(value1.value, value2.value)
+        if result is not None:
+            return IntegerBranch(result, value1.discarded + value2.discarded)
 
-        instructions += self.expr_operator.generateInstructions()
+    if isConstant(value2, expr_operator.identity):
+        return value1
+    if expr_operator.commutative and isConstant(value1, expr_operator.identity):
+        return value2
 
-        return instructions
+    if isConstant(value2, expr_operator.absorbing) and not value1.hasSideEffects():
+        return IntegerBranch(expr_operator.absorbing, [value1])
+    if expr_operator.commutative and isConstant(value1, expr_operator.absorbing) and not value2.hasSideEffects():
+        return IntegerBranch(expr_operator.absorbing, [value2])
+
+    if expr_operator.self_result is not None and value1.isSameValue(value2):
+        return IntegerBranch(expr_operator.self_result, [value1])
+
+    return ExpressionBranch(value1, expr_operator, value2)
+
+
+# operands of a run of the same associative operator, turned into a balanced tree once the run ends
+class OperandChain:
+    def __init__(self, expr_operator: Operator, operands: list[ValueBranch]):
+        self.expr_operator = expr_operator
+        self.operands = operands
+
+    def intoBranch(self, begin: int = 0, end: int = -1) -> ValueBranch:
+        if end == -1:
+            self.foldConstants()
+            end = len(self.operands)
+        if end - begin == 1:
+            return self.operands[begin]
+        middle = (begin + end) // 2
+        return foldExpression(self.intoBranch(begin, middle), self.expr_operator, self.intoBranch(middle, end))
+
+    # constants are moved to the end of the run and folded into one, associative operators are also commutative
+    def foldConstants(self):
+        constants = [operand for operand in self.operands if type(operand) is IntegerBranch]
+        if len(constants) < 2:
+            return
+        self.operands = [operand for operand in self.operands if type(operand) is not IntegerBranch]
+        folded = constants[0]
+        for constant in constants[1:]:
+            folded = foldExpression(folded, self.expr_operator, constant)
+            if type(folded) is not IntegerBranch:
+                # the constants could not be folded, so they are kept as they were
+                self.operands += constants
+                return
+        self.operands.append(folded)
 
 
 class ExpressionFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return ValueFactory().getLeadingKinds()
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         value_factory = ValueFactory()
-        pos, value = value_factory.parseDontExpect(pos, tokens)
-        if value is None:
-            raise TokenExpectedException(tokens[pos].pos, "Expected value")
+        # precedence climbing with explicit stacks, so long expressions do not recurse, every open bracket keeps the
+        # stacks of the expression around it, so nested brackets do not recurse either
+        values: list[Union[ValueBranch, OperandChain]] = []
+        operators: list[Operator] = []
+        outer: list[tuple[list[Union[ValueBranch, OperandChain]], list[Operator]]] = []
+        while True:
+            while tokens[pos] == Symbols.LEFT_BRACKET:
+                outer.append((values, operators))
+                values, operators = [], []
+                pos += 1
 
-        return self.parseRecursive(pos, tokens, value)
+            if not values and not outer:
+                pos, value = value_factory.parseDontExpect(pos, tokens)
+                if value is None:
+                    raise TokenExpectedException(tokens.getPos(pos), "Expected value")
+            else:
+                pos, value = value_factory.parseExpect(pos, tokens)
+            values.append(value)
 
-    def parseRecursive(self, pos: int, tokens: list[Token], expr_branch: ValueBranch) -> (int, ValueBranch):
-        if tokens[pos] not in Operator.operators.keys():
-            return pos, expr_branch
+            while tokens[pos] == Symbols.RIGHT_BRACKET and outer:
+                pos += 1
+                while operators:
+                    self.reduce(values, operators)
+                value = self.intoBranch(values[0])
+                values, operators = outer.pop()
+                values.append(value)
 
-        expr_operator = Operator.operators[tokens[pos]]
-        pos += 1
-        value_factory = ValueFactory()
-        pos, value = value_factory.parseExpect(pos, tokens)
-        new_expr_branch = ExpressionBranch(expr_branch, expr_operator, value)
+            if tokens[pos] not in Operator.operators:
+                break
+            expr_operator = Operator.operators[tokens[pos]]
+            pos += 1
+            while operators and operators[-1].precedence >= expr_operator.precedence:
+                self.reduce(values, operators)
+            operators.append(expr_operator)
+
+        if outer:
+            raise TokenNeededException(tokens.getPos(pos), "Expected ')'")
+
+        while operators:
+            self.reduce(values, operators)
+
+        return pos, self.intoBranch(values[0])
+
+    @staticmethod
+    def intoBranch(value: Union[ValueBranch, OperandChain]) -> ValueBranch:
+        if type(value) is OperandChain:
+            return value.intoBranch()
+        return value
+
+    def reduce(self, values: list[Union[ValueBranch, OperandChain]], operators: list[Operator]):
+        expr_operator = operators.pop()
+        right = self.intoBranch(values.pop())
+        left = values.pop()
 
-        return self.parseRecursive(pos, tokens, new_expr_branch)
+        if not expr_operator.associative:
+            values.append(foldExpression(self.intoBranch(left), expr_operator, right))
+        elif type(left) is OperandChain and left.expr_operator is expr_operator:
+            left.operands.append(right)
+            values.append(left)
+        else:
+            values.append(OperandChain(expr_operator, [self.intoBranch(left), right]))
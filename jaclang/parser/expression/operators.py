@@ -1,113 +1,206 @@
-from abc import abstractmethod
+from typing import Optional
 
 from jaclang.generator import Instructions, Registers, Instruction
+from jaclang.generator.generator import Parameter, WORD_BITS
 from jaclang.lexer import Symbols
 
+# values below this are the same whether the target treats a word as signed or unsigned
+SIGN_BIT = 1 << (WORD_BITS - 1)
+
 
 class Operator:
     operators = {}
-
-    def __init__(self, name: str):
+    # instruction the operator is applied with, it takes a register or an immediate as either operand
+    instruction: type = None
+    commutative = False
+    # value of b for which a op b is a, for commutative operators it works for a as well
+    identity: Optional[int] = None
+    # value of b for which a op b is b whatever a is
+    absorbing: Optional[int] = None
+    # result of a op a
+    self_result: Optional[int] = None
+
+    # operators with higher precedence bind tighter, associative ones may be regrouped freely
+    def __init__(self, name: str, precedence: int, associative: bool = False):
         self.name = name
+        self.precedence = precedence
+        self.associative = associative
+        # comparison whose result is 1 exactly when the result of this one is 0
+        self.inverse: Optional[Operator] = None
+
+    # applies the operator at compile time, None if the result could depend on how the target treats it
+    def fold(self, a: int, b: int) -> Optional[int]:
+        if not (0 <= a < SIGN_BIT and 0 <= b < SIGN_BIT):
+            return None
+        result = self.compute(a, b)
+        if result is None or not 0 <= result < SIGN_BIT:
+            return None
+        return result
 
-    @abstractmethod
-    def generateInstructions(self) -> list[Instruction]:
-        pass
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return None
+
+    # returns instructions that apply the operator to a and b and leave the result in RETURN
+    def generateInstructions(self, a: Parameter, b: Parameter) -> list[Instruction]:
+        return [self.instruction(a, b, Registers.RETURN)]
 
 
 class PlusOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Add(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Add
+    commutative = True
+    identity = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a + b
 
 
 class MinusOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Subtract(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Subtract
+    identity = 0
+    self_result = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a - b
 
 
 class EqualsOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Equals(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Equals
+    commutative = True
+    self_result = 1
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a == b)
 
 
 class LesserOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.LessThan(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.LessThan
+    self_result = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a < b)
 
 
 class GreaterOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.GreaterThan(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.GreaterThan
+    self_result = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a > b)
 
 
 class LesserOrEqualOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.LessThanEquals(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.LessThanEquals
+    self_result = 1
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a <= b)
 
 
 class GreaterOrEqualOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.GreaterThanEquals(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.GreaterThanEquals
+    self_result = 1
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a >= b)
 
 
 class NotEqualOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.NotEquals(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.NotEquals
+    commutative = True
+    self_result = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return int(a != b)
 
 
 class BitShiftLeftOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.BitShiftLeft(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.BitShiftLeft
+    identity = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a << b if b < WORD_BITS else None
 
 
 class BitShiftRightOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.BitShiftRight(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.BitShiftRight
+    identity = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a >> b if b < WORD_BITS else None
 
 
 class OrOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Or(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Or
+    commutative = True
+    identity = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a | b
 
 
 class XorOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Xor(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Xor
+    commutative = True
+    identity = 0
+    self_result = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a ^ b
 
 
 class AndOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.And(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.And
+    commutative = True
+    absorbing = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a & b
 
 
 class MultiplyOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Multiply(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Multiply
+    commutative = True
+    identity = 1
+    absorbing = 0
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a * b
 
 
 class DivideOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Divide(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
+    instruction = Instructions.Divide
+    identity = 1
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a // b if b != 0 else None
 
 
 class ModuloOperator(Operator):
-    def generateInstructions(self) -> list[Instruction]:
-        return [Instructions.Modulo(Registers.EXPRESSION, Registers.RETURN, Registers.RETURN)]
-
-
-Operator.operators[Symbols.PLUS] = PlusOperator(Symbols.PLUS.name)
-Operator.operators[Symbols.MINUS] = MinusOperator(Symbols.MINUS.name)
-Operator.operators[Symbols.EQUALS] = EqualsOperator(Symbols.EQUALS.name)
-Operator.operators[Symbols.LESS_THAN] = LesserOperator(Symbols.LESS_THAN.name)
-Operator.operators[Symbols.GREATER_THAN] = GreaterOperator(Symbols.GREATER_THAN.name)
-Operator.operators[Symbols.LESS_OR_EQUAL_THAN] = LesserOrEqualOperator(Symbols.LESS_OR_EQUAL_THAN.name)
-Operator.operators[Symbols.GREATER_OR_EQUAL_THAN] = GreaterOrEqualOperator(Symbols.GREATER_OR_EQUAL_THAN.name)
-Operator.operators[Symbols.NOT_EQUAL] = NotEqualOperator(Symbols.NOT_EQUAL.name)
-Operator.operators[Symbols.BIT_SHIFT_LEFT] = BitShiftLeftOperator(Symbols.BIT_SHIFT_LEFT.name)
-Operator.operators[Symbols.BIT_SHIFT_RIGHT] = BitShiftRightOperator(Symbols.BIT_SHIFT_RIGHT.name)
-Operator.operators[Symbols.OR] = OrOperator(Symbols.OR.name)
-Operator.operators[Symbols.XOR] = XorOperator(Symbols.XOR.name)
-Operator.operators[Symbols.AND] = AndOperator(Symbols.AND.name)
-Operator.operators[Symbols.MULTIPLY] = MultiplyOperator(Symbols.MULTIPLY.name)
-Operator.operators[Symbols.DIVIDE] = DivideOperator(Symbols.DIVIDE.name)
-Operator.operators[Symbols.MODULO] = ModuloOperator(Symbols.MODULO.name)
+    instruction = Instructions.Modulo
+
+    def compute(self, a: int, b: int) -> Optional[int]:
+        return a % b if b != 0 else None
+
+
+Operator.operators[Symbols.MULTIPLY] = MultiplyOperator(Symbols.MULTIPLY.name, 10, True)
+Operator.operators[Symbols.DIVIDE] = DivideOperator(Symbols.DIVIDE.name, 10)
+Operator.operators[Symbols.MODULO] = ModuloOperator(Symbols.MODULO.name, 10)
+Operator.operators[Symbols.PLUS] = PlusOperator(Symbols.PLUS.name, 9, True)
+Operator.operators[Symbols.MINUS] = MinusOperator(Symbols.MINUS.name, 9)
+Operator.operators[Symbols.BIT_SHIFT_LEFT] = BitShiftLeftOperator(Symbols.BIT_SHIFT_LEFT.name, 8)
+Operator.operators[Symbols.BIT_SHIFT_RIGHT] = BitShiftRightOperator(Symbols.BIT_SHIFT_RIGHT.name, 8)
+Operator.operators[Symbols.LESS_THAN] = LesserOperator(Symbols.LESS_THAN.name, 7)
+Operator.operators[Symbols.GREATER_THAN] = GreaterOperator(Symbols.GREATER_THAN.name, 7)
+Operator.operators[Symbols.LESS_OR_EQUAL_THAN] = LesserOrEqualOperator(Symbols.LESS_OR_EQUAL_THAN.name, 7)
+Operator.operators[Symbols.GREATER_OR_EQUAL_THAN] = GreaterOrEqualOperator(Symbols.GREATER_OR_EQUAL_THAN.name, 7)
+Operator.operators[Symbols.EQUALS] = EqualsOperator(Symbols.EQUALS.name, 6)
+Operator.operators[Symbols.NOT_EQUAL] = NotEqualOperator(Symbols.NOT_EQUAL.name, 6)
+Operator.operators[Symbols.AND] = AndOperator(Symbols.AND.name, 5, True)
+Operator.operators[Symbols.XOR] = XorOperator(Symbols.XOR.name, 4, True)
+Operator.operators[Symbols.OR] = OrOperator(Symbols.OR.name, 3, True)
+
+for symbol, inverse_symbol in ((Symbols.LESS_THAN, Symbols.GREATER_OR_EQUAL_THAN),
+                               (Symbols.GREATER_THAN, Symbols.LESS_OR_EQUAL_THAN),
+                               (Symbols.EQUALS, Symbols.NOT_EQUAL)):
+    Operator.operators[symbol].inverse = Operator.operators[inverse_symbol]
+    Operator.operators[inverse_symbol].inverse = Operator.operators[symbol]
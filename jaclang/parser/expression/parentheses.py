@@ -1,12 +1,19 @@
-from jaclang.lexer import Symbols, Token
+from typing import Optional
+
+from jaclang.lexer import Symbols, TokenStream
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.scope import BranchInScopeFactory, BranchInScope, TokenExpectedException
 
 
 class ParenthesesFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Symbols.LEFT_BRACKET}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         if tokens[pos] != Symbols.LEFT_BRACKET:
-            raise TokenExpectedException(tokens[pos].pos, "Expected '('")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected '('")
 
         pos += 1
 
@@ -14,7 +21,7 @@ class ParenthesesFactory(BranchInScopeFactory):
         pos, expr = expr_factory.parseExpect(pos, tokens)
 
         if tokens[pos] != Symbols.RIGHT_BRACKET:
-            raise TokenExpectedException(tokens[pos].pos, "Expected ')'")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected ')'")
 
         pos += 1
 
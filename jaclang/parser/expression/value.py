@@ -1,20 +1,69 @@
 from abc import ABC
+from typing import Optional, Iterator
 
-from jaclang.lexer import Token
-from jaclang.parser.scope import BranchInScope, BranchInScopeFactory, TokenExpectedException
+from jaclang.generator import Instruction, Instructions, Registers
+from jaclang.generator.generator import RegisterParameter, LabelParameter
+from jaclang.lexer import TokenStream
+from jaclang.parser.root import FactoryDispatcher
+from jaclang.parser.scope import BranchInScope, BranchInScopeFactory, TokenExpectedException, ScopeContext
 
+# registers expressions may keep intermediate values in, EXPRESSION is left out as the register spills are popped to
+TEMPORARY_REGISTERS = [Registers.REG1, Registers.REG2, Registers.REG3, Registers.REG4]
 
+
+# values are generated into RETURN
 class ValueBranch(BranchInScope, ABC):
-    pass
+    # registers needed to generate the value without spilling, RETURN included
+    def getRegisterNeed(self) -> int:
+        return 1
+
+    # values with side effects have to be generated in the order they appear in
+    def hasSideEffects(self) -> bool:
+        return False
+
+    # values that call functions do not keep any register except RETURN
+    def clobbersRegisters(self) -> bool:
+        return False
+
+    # loadable values can be generated straight into any register with generateInstructionsInto
+    def isLoadable(self) -> bool:
+        return False
+
+    # whether the value is always the same as other, if neither is evaluated in between
+    def isSameValue(self, other: "ValueBranch") -> bool:
+        return False
+
+    def generateInstructionsInto(self, context: ScopeContext, register: RegisterParameter) -> list[Instruction]:
+        return list(self.generateInstructions(context)) + [Instructions.Mov(Registers.RETURN, register)]
+
+    # jumps to label if the value is 1, or if it is not 1 when jump_if is False
+    def generateJump(self, context: ScopeContext, label: str, jump_if: bool) -> Iterator[Instruction]:
+        yield from self.generateInstructions(context)
+        if jump_if:
+            yield Instructions.Jump(LabelParameter(label), Registers.RETURN)
+        else:
+            skip_label = f"skip_{context.id_manager.requestId()}"
+            yield Instructions.Jump(LabelParameter(skip_label), Registers.RETURN)
+            yield Instructions.Jump(LabelParameter(label), None)
+            yield Instructions.Label(skip_label)
+
+    # generates the value using only RETURN and free_registers
+    def generateNestedValue(self, context: ScopeContext, free_registers: list[RegisterParameter]) -> Iterator:
+        yield from self.generateInstructions(context)
 
 
 class ValueFactory(BranchInScopeFactory):
     factories = []
+    dispatcher = FactoryDispatcher(factories)
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return ValueFactory.dispatcher.getLeadingKinds()
 
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        for factory in ValueFactory.factories:
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        for factory in ValueFactory.dispatcher.getCandidates(tokens[pos]):
             pos, value = factory.parseDontExpect(pos, tokens)
             if value is not None:
                 return pos, value
 
-        raise TokenExpectedException(tokens[pos].pos, "Expected value")
+        raise TokenExpectedException(tokens.getPos(pos), "Expected value")
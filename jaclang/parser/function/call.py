@@ -1,18 +1,27 @@
+from typing import Optional, Iterable
+
 from jaclang.error.syntax_error import JaclangSyntaxError
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.generator.generator import LabelParameter
-from jaclang.lexer import Token, IdentifierToken, Symbols
+from jaclang.generator.generator import LabelParameter, ValueParameter
+from jaclang.lexer import TokenStream, TokenKinds, Symbols
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
-from jaclang.parser.function.declaration import FunctionData
+from jaclang.parser.function.declaration import FunctionData, get_arg_pos_on_stack
 from jaclang.parser.root import InitGenerator, RootContext
 from jaclang.parser.scope import BranchInScope, BranchInScopeFactory, TokenExpectedException, ScopeContext, StackManager
+from jaclang.parser.variable.assignment import VariableData
+
+# registers the arguments of a tail call are kept in while the frame is taken down, the ones locals are not promoted
+# to come first
+TAIL_CALL_REGISTERS = [Registers.RETURN, Registers.EXPRESSION, Registers.REG1, Registers.REG2, Registers.REG3,
+                       Registers.REG4]
 
 
 class FunctionCallBranch(ValueBranch):
-    def __init__(self, function_name: str, args: list[ValueBranch]):
+    def __init__(self, function_name: str, args: list[ValueBranch], pos: int = -1):
         self.function_name = function_name
         self.args = args
+        self.pos = pos
 
     def printInfo(self, nested_level: int):
         print('    ' * nested_level, f"call: {self.function_name}")
@@ -20,16 +29,29 @@ class FunctionCallBranch(ValueBranch):
             print('    ' * nested_level, "arg:")
             arg.printInfo(nested_level + 1)
 
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        if self.function_name not in context.symbols.keys():
-            raise JaclangSyntaxError(-1, f"Symbol '{self.function_name}' undefined")
+    def hasSideEffects(self) -> bool:
+        return True
+
+    def clobbersRegisters(self) -> bool:
+        return True
+
+    def getFunction(self, context: ScopeContext) -> FunctionData:
+        if self.function_name not in context.symbols:
+            raise JaclangSyntaxError(self.pos, f"Symbol '{self.function_name}' undefined")
 
         if type(context.symbols[self.function_name]) is not FunctionData:
-            raise JaclangSyntaxError(-1, f"Symbol '{self.function_name}' is not a function")
+            raise JaclangSyntaxError(self.pos, f"Symbol '{self.function_name}' is not a function")
 
         func = context.symbols[self.function_name]
         if func.args_num != len(self.args):
-            raise JaclangSyntaxError(-1, f"Incorrect number of arguments on a function call (got {len(self.args)}, expected {func.args_num})")
+            raise JaclangSyntaxError(self.pos, f"Incorrect number of arguments on a function call (got {len(self.args)}, expected {func.args_num})")
+        return func
+
+    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        func = self.getFunction(context)
+        if context.inliner is not None and \
+                context.inliner.shouldInline(self.function_name, func.size, context.curr_function):
+            return self.generateInlined(context, func)
 
         jmp_label = f"jump_{context.id_manager.requestId()}"
         instructions = [
@@ -48,15 +70,101 @@ class FunctionCallBranch(ValueBranch):
 
         return instructions
 
+    # a call whose value is returned right away reuses the frame, so the called function returns straight to the
+    # caller, None if the call is inlined or has more arguments than there are registers to keep them in
+    def generateTailCall(self, context: ScopeContext) -> Optional[list[Instruction]]:
+        func = self.getFunction(context)
+        if context.inliner is not None and \
+                context.inliner.canInline(self.function_name, func.size, context.curr_function):
+            return None
+        recursive = self.function_name == context.curr_function
+        if not recursive and len(self.args) > len(TAIL_CALL_REGISTERS):
+            return None
+
+        instructions = []
+        for arg in self.args:
+            instructions += arg.generateInstructions(context)
+            instructions += [
+                Instructions.Push(Registers.RETURN),
+            ]
+
+        if recursive:
+            # the arguments are overwritten and the body runs again in the same frame
+            for i in reversed(range(len(self.args))):
+                instructions += [
+                    Instructions.Pop(Registers.RETURN),
+                    Instructions.MemoryWrite(Registers.STACK_BASE, get_arg_pos_on_stack(i, len(self.args)),
+                                             Registers.RETURN),
+                ]
+            instructions += [
+                Instructions.Jump(LabelParameter(f"func_{self.function_name}_body"), None),
+            ]
+            return instructions
+
+        # the frame is taken down like when returning, but the return label is left for the called function
+        registers = TAIL_CALL_REGISTERS[:len(self.args)]
+        for register in reversed(registers):
+            instructions += [
+                Instructions.Pop(register),
+            ]
+        instructions += [
+            Instructions.Mov(Registers.STACK_BASE, Registers.STACK_TOP),
+            Instructions.Pop(Registers.STACK_BASE),
+            Instructions.Subtract(Registers.STACK_TOP, ValueParameter(context.args_num), Registers.STACK_TOP),
+        ]
+        for register in registers:
+            instructions += [
+                Instructions.Push(register),
+            ]
+        instructions += [
+            Instructions.Jump(LabelParameter("func_" + self.function_name), None),
+        ]
+        return instructions
+
+    # the arguments are kept in new slots of the caller's frame and the body sees them as its own arguments,
+    # returning jumps to the end of the body with the value in the return register like after a call
+    def generateInlined(self, context: ScopeContext, func: FunctionData) -> list[Instruction]:
+        declaration = func.declaration
+        body_context = ScopeContext(context.symbols.getRootTable(), context.id_manager, context.stack_manager,
+                                    context.curr_function, context.errors, context.inliner)
+        body_context.return_label = f"inline_end_{context.id_manager.requestId()}"
+        body_context.inlined = True
+        body_context.symbols.pushScope()
+
+        instructions = []
+        for arg, arg_name in zip(self.args, declaration.arg_names):
+            instructions += arg.generateInstructions(context)
+            pos_on_stack = context.stack_manager.allocate()
+            body_context.symbols.declare(arg_name, VariableData(pos_on_stack))
+            instructions += [
+                Instructions.MemoryWrite(Registers.STACK_BASE, pos_on_stack, Registers.RETURN),
+            ]
+
+        context.inliner.inlining.append(self.function_name)
+        try:
+            instructions += declaration.body.generateInstructions(body_context)
+        finally:
+            context.inliner.inlining.pop()
+        instructions += [
+            Instructions.Label(body_context.return_label),
+        ]
+        return instructions
+
 
 class FunctionCallFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if type(tokens[pos]) is not IdentifierToken:
-            raise TokenExpectedException(tokens[pos].pos, "Expected identifier")
-        function_name = tokens[pos].identifier
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {TokenKinds.IDENTIFIER}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected identifier")
+        function_name = tokens.getIdentifier(pos)
+        begin_pos = tokens.getPos(pos)
         pos += 1
         if tokens[pos] != Symbols.LEFT_BRACKET:
-            raise TokenExpectedException(tokens[pos].pos, "Expected '('")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected '('")
 
         expr_factory = ExpressionFactory()
         args = []
@@ -66,10 +174,10 @@ class FunctionCallFactory(BranchInScopeFactory):
             args.append(branch)
 
         pos += 1
-        return pos, FunctionCallBranch(function_name, args)
+        return pos, FunctionCallBranch(function_name, args, begin_pos)
 
 
 class MainCallGenerator(InitGenerator):
-    def generateInitInstructions(self, context: RootContext) -> list[Instruction]:
+    def generateInitInstructions(self, context: RootContext) -> Iterable[Instruction]:
         return FunctionCallBranch("main", []).generateInstructions(
             ScopeContext(context.symbols, context.id_manager, StackManager(), "main"))
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from jaclang.lexer import TokenStream, TokenKinds, Symbols, Keywords
+
+# the only function the start code calls
+ENTRY_FUNCTION = "main"
+
+
+# the calls in every function, found from the tokens before anything is generated, functions can not be nested,
+# so the calls after a func keyword are in that function until the next func keyword
+class CallGraph:
+    def __init__(self, tokens: TokenStream):
+        # functions every function calls, once for every call
+        self.calls: dict[str, list[str]] = {}
+        self.call_counts: dict[str, int] = {}
+
+        curr_function: Optional[str] = None
+        # an identifier followed by a bracket is a call, unless it is the name of a function being declared
+        for pos in range(len(tokens) - 1):
+            if tokens[pos] != TokenKinds.IDENTIFIER:
+                continue
+            if pos != 0 and tokens[pos - 1] == Keywords.FUNC:
+                curr_function = tokens.getIdentifier(pos)
+                self.calls.setdefault(curr_function, [])
+            elif tokens[pos + 1] == Symbols.LEFT_BRACKET:
+                name = tokens.getIdentifier(pos)
+                self.call_counts[name] = self.call_counts.get(name, 0) + 1
+                if curr_function is not None:
+                    self.calls.setdefault(curr_function, []).append(name)
+
+    # functions the start code can reach through calls
+    def findUsedFunctions(self) -> set[str]:
+        used = {ENTRY_FUNCTION}
+        pending = [ENTRY_FUNCTION]
+        while pending:
+            for name in self.calls.get(pending.pop(), []):
+                if name not in used:
+                    used.add(name)
+                    pending.append(name)
+        return used
+
+    # a call of a function to itself is never inlined
+    def isRecursive(self, name: str) -> bool:
+        return name in self.calls.get(name, [])
@@ -1,17 +1,26 @@
-from copy import copy
+from typing import Optional, Iterator
 
 from jaclang.error.syntax_error import JaclangSyntaxError
 from jaclang.generator import Instruction, Instructions, Registers
 from jaclang.generator.generator import ValueParameter
-from jaclang.lexer import Token, Keywords, IdentifierToken, Symbols
+from jaclang.generator.instructions import count_instructions
+from jaclang.lexer import TokenStream, Keywords, TokenKinds, Symbols
 from jaclang.parser.root import SymbolData, BranchInRoot, BranchInRootFactory, RootContext
 from jaclang.parser.scope import ScopeBranch, ScopeFactory, ScopeContext, StackManager
 from jaclang.parser.variable.assignment import VariableData
 
 
+# arguments are pushed in order before the frame base is, so the last one is right below the saved frame base
+def get_arg_pos_on_stack(index: int, args_num: int) -> int:
+    return index - args_num - 1
+
+
 class FunctionData(SymbolData):
-    def __init__(self, args_num: int):
+    def __init__(self, args_num: int, declaration: Optional["FunctionDeclarationBranch"] = None):
         self.args_num = args_num
+        self.declaration = declaration
+        # instructions in the body, set once it is generated without errors
+        self.size: Optional[int] = None
 
 
 class FunctionDeclarationBranch(BranchInRoot):
@@ -26,59 +35,78 @@ class FunctionDeclarationBranch(BranchInRoot):
         print('    ' * nested_level, f"    args: {' '.join(self.arg_names)}")
         self.body.printInfo(nested_level + 1)
 
-    def generateInstructions(self, context: RootContext) -> list[Instruction]:
-        context.symbols[self.name] = FunctionData(len(self.arg_names))
-
-        new_context = ScopeContext(copy(context.symbols), context.id_manager, StackManager(), self.name)
-
-        curr_pos_on_stack = -2
-        for arg in reversed(self.arg_names):
-            new_context.symbols[arg] = VariableData(curr_pos_on_stack)
-            curr_pos_on_stack -= 1
-
-        body_instructions = self.body.generateInstructions(new_context)
-
-        begin_instructions: list[Instruction] = [
-            Instructions.Label(f"func_{self.name}"),
-            Instructions.Push(Registers.STACK_BASE),
-            Instructions.Mov(Registers.STACK_TOP, Registers.STACK_BASE),
-            Instructions.Add(Registers.STACK_BASE, ValueParameter(new_context.stack_manager.getSize()), Registers.STACK_TOP),
-        ]
-
-        return_instructions: list[Instruction] = [
-            Instructions.Label(f"func_{self.name}_return"),
-            Instructions.Mov(Registers.STACK_BASE, Registers.STACK_TOP),
-            Instructions.Pop(Registers.STACK_BASE),
-            Instructions.Subtract(Registers.STACK_TOP, ValueParameter(len(self.arg_names)), Registers.STACK_TOP),
-            Instructions.Pop(Registers.EXPRESSION),
-            Instructions.Jump(Registers.EXPRESSION, None),
-        ]
-
-        return begin_instructions + body_instructions + return_instructions
+    def declareSymbols(self, context: RootContext):
+        context.symbols.declare(self.name, FunctionData(len(self.arg_names), self))
+
+    def generateInstructions(self, context: RootContext) -> Iterator[Instruction]:
+        self.declareSymbols(context)
+
+        new_context = ScopeContext(context.symbols, context.id_manager, StackManager(), self.name, context.errors,
+                                   context.inliner)
+        new_context.args_num = len(self.arg_names)
+        new_context.symbols.pushScope()
+
+        for i, arg in enumerate(self.arg_names):
+            new_context.symbols.declare(arg, VariableData(get_arg_pos_on_stack(i, len(self.arg_names))))
+
+        # the frame size is only known once the whole body is generated, so one function is buffered at a time
+        num_errors = len(context.errors.errors) if context.errors is not None else 0
+        # recursive tail calls jump to the body
+        body_instructions = [Instructions.Label(f"func_{self.name}_body")]
+        body_instructions += self.body.generateInstructions(new_context)
+        new_context.symbols.popScope()
+        # errors of a function are not reported again at every call it is inlined at
+        if context.errors is None or len(context.errors.errors) == num_errors:
+            context.symbols[self.name].size = count_instructions(body_instructions)
+        # functions nothing calls and functions inlined at every call are only generated for their errors and size
+        size = context.symbols[self.name].size
+        if (context.used_functions is not None and self.name not in context.used_functions) or \
+                (context.inliner is not None and context.inliner.isInlinedEverywhere(self.name, size)):
+            if context.removed_functions is not None:
+                context.removed_functions.functions += 1
+                context.removed_functions.instructions += size or 0
+            return
+
+        yield Instructions.Label(f"func_{self.name}")
+        yield Instructions.Push(Registers.STACK_BASE)
+        yield Instructions.Mov(Registers.STACK_TOP, Registers.STACK_BASE)
+        yield Instructions.Add(Registers.STACK_BASE, ValueParameter(new_context.stack_manager.getSize()), Registers.STACK_TOP)
+
+        yield from body_instructions
+
+        yield Instructions.Label(f"func_{self.name}_return")
+        yield Instructions.Mov(Registers.STACK_BASE, Registers.STACK_TOP)
+        yield Instructions.Pop(Registers.STACK_BASE)
+        yield Instructions.Subtract(Registers.STACK_TOP, ValueParameter(len(self.arg_names)), Registers.STACK_TOP)
+        yield Instructions.Pop(Registers.EXPRESSION)
+        yield Instructions.Jump(Registers.EXPRESSION, None)
 
 
 class FunctionDeclarationFactory(BranchInRootFactory):
-    def parse(self, pos: int, tokens: list[Token]) -> (int, BranchInRoot):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.FUNC}
+
+    def parse(self, pos: int, tokens: TokenStream) -> (int, BranchInRoot):
         if tokens[pos] != Keywords.FUNC:
             return pos, None
 
         pos += 1
-        if type(tokens[pos]) is not IdentifierToken:
-            raise JaclangSyntaxError(tokens[pos].pos, "Expected identifier after func keyword")
-        func_name = tokens[pos].identifier
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise JaclangSyntaxError(tokens.getPos(pos), "Expected identifier after func keyword")
+        func_name = tokens.getIdentifier(pos)
 
         pos += 1
         if tokens[pos] != Symbols.LEFT_BRACKET:
-            raise JaclangSyntaxError(tokens[pos].pos, "Expected '(' after func name")
+            raise JaclangSyntaxError(tokens.getPos(pos), "Expected '(' after func name")
 
         arg_names = []
         pos += 1
         while tokens[pos] != Symbols.RIGHT_BRACKET:
-            if type(tokens[pos]) is IdentifierToken:
-                arg_names.append(tokens[pos].identifier)
+            if tokens[pos] == TokenKinds.IDENTIFIER:
+                arg_names.append(tokens.getIdentifier(pos))
                 pos += 1
             else:
-                raise JaclangSyntaxError(tokens[pos].pos, "Expected ')' or variable name")
+                raise JaclangSyntaxError(tokens.getPos(pos), "Expected ')' or variable name")
 
         pos += 1
 
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from jaclang.parser.function.call_graph import CallGraph, ENTRY_FUNCTION
+
+# functions whose body has at most this many instructions are inlined at every call while the budget lasts
+SMALL_FUNCTION_SIZE = 12
+# instructions inlining small functions may add to the program if no budget is given
+DEFAULT_INLINE_BUDGET = 256
+
+
+# decides which calls are replaced by the body of the called function, a function called from one place only is
+# always inlined there, small functions use up the code size budget by their size
+class Inliner:
+    def __init__(self, call_graph: CallGraph, budget: int = DEFAULT_INLINE_BUDGET):
+        self.budget = budget
+        self.call_graph = call_graph
+        # functions whose body is being inlined, innermost last
+        self.inlining: list[str] = []
+        # small functions inlined at all of their calls, the budget for those was used up when they were generated
+        self.inlined_everywhere: set[str] = set()
+
+    # size is None for functions that are not generated yet or had errors, calls to them are left as they are
+    def canInline(self, name: str, size: Optional[int], caller: str) -> bool:
+        if size is None or name == caller or name in self.inlining:
+            return False
+        return name in self.inlined_everywhere or self.isCalledOnce(name) or \
+            (size <= SMALL_FUNCTION_SIZE and size <= self.budget)
+
+    # like canInline, but uses up the budget if the call is inlined
+    def shouldInline(self, name: str, size: Optional[int], caller: str) -> bool:
+        if not self.canInline(name, size, caller):
+            return False
+        if name not in self.inlined_everywhere and not self.isCalledOnce(name):
+            self.budget -= size
+        return True
+
+    # the one call is also inlined in every copy of a body inlined at several calls, the size of that body already
+    # includes it
+    def isCalledOnce(self, name: str) -> bool:
+        return self.call_graph.call_counts.get(name) == 1
+
+    # decided once the function is generated and before any call to it is, so its own code does not have to be
+    # emitted if this is true, the start code calls the entry function without inlining it
+    def isInlinedEverywhere(self, name: str, size: Optional[int]) -> bool:
+        if size is None or name == ENTRY_FUNCTION or self.call_graph.isRecursive(name):
+            return False
+        if self.isCalledOnce(name):
+            return True
+        needed_budget = self.call_graph.call_counts.get(name, 0) * size
+        if size > SMALL_FUNCTION_SIZE or needed_budget > self.budget:
+            return False
+        self.budget -= needed_budget
+        self.inlined_everywhere.add(name)
+        return True
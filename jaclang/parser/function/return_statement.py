@@ -2,9 +2,10 @@ from typing import Optional
 
 from jaclang.generator import Instruction, Instructions
 from jaclang.generator.generator import LabelParameter
-from jaclang.lexer import Token, Keywords
+from jaclang.lexer import TokenStream, Keywords
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
+from jaclang.parser.function.call import FunctionCallBranch
 from jaclang.parser.scope import BranchInScope, BranchInScopeFactory, TokenExpectedException, ScopeContext
 
 
@@ -13,11 +14,17 @@ class ReturnStatementBranch(BranchInScope):
         self.value = value
 
     def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        # the value of a call is returned right away, unless the function is being inlined
+        if type(self.value) is FunctionCallBranch and not context.inlined:
+            tail_call = self.value.generateTailCall(context)
+            if tail_call is not None:
+                return tail_call
+
         instructions = []
         if self.value is not None:
             instructions += self.value.generateInstructions(context)
         instructions += [
-            Instructions.Jump(LabelParameter(f"func_{context.curr_function}_return"), None),
+            Instructions.Jump(LabelParameter(context.return_label), None),
         ]
         return instructions
 
@@ -28,9 +35,12 @@ class ReturnStatementBranch(BranchInScope):
 
 
 class ReturnStatementFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScopeFactory):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.RETURN}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScopeFactory):
         if tokens[pos] != Keywords.RETURN:
-            raise TokenExpectedException(pos, "Expected return keyword")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected return keyword")
 
         pos += 1
 
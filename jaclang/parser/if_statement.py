@@ -1,10 +1,11 @@
-from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.generator.generator import LabelParameter
-from jaclang.lexer import Token, Keywords
+from typing import Optional, Iterator
+
+from jaclang.generator import Instructions
+from jaclang.lexer import TokenStream, Keywords
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.scope import ScopeFactory, BranchInScope, BranchInScopeFactory, ModifierBranchInScope, \
-    TokenExpectedException, ScopeContext
+    TokenExpectedException, ScopeContext, Nested
 
 
 class IfStatementBranch(ModifierBranchInScope):
@@ -12,31 +13,25 @@ class IfStatementBranch(ModifierBranchInScope):
         super().__init__()
         self.condition = condition
 
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        instructions = self.condition.generateInstructions(context)
-        if_begin = f"if_begin_{context.id_manager.requestId()}"
+    def generateNestedInstructions(self, context: ScopeContext) -> Iterator:
         if_end = f"if_end_{context.id_manager.requestId()}"
-        instructions += [
-            Instructions.Jump(LabelParameter(if_begin), Registers.RETURN),
-            Instructions.Jump(LabelParameter(if_end), None),
-            Instructions.Label(if_begin),
-        ]
-        instructions += self.branch.generateInstructions(context)
-        instructions += [
-            Instructions.Label(if_end),
-        ]
-        return instructions
-
-    def printInfo(self, nested_level: int):
+        yield from self.condition.generateJump(context, if_end, False)
+        yield Nested(self.branch.generateNestedInstructions(context))
+        yield Instructions.Label(if_end)
+
+    def printNestedInfo(self, nested_level: int) -> Iterator:
         print("    " * nested_level, "IfStatement:")
         self.condition.printInfo(nested_level + 1)
-        self.branch.printInfo(nested_level + 1)
+        yield Nested(self.branch.printNestedInfo(nested_level + 1))
 
 
 class IfStatementFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.IF}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         if tokens[pos] != Keywords.IF:
-            raise TokenExpectedException(tokens[pos].pos, "Expected if keyword")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected if keyword")
         pos += 1
 
         expr_factory = ExpressionFactory()
@@ -1,27 +1,53 @@
+from typing import Optional, Iterator
+
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.generator.generator import ValueParameter
-from jaclang.lexer import Token, ConstantToken
-from jaclang.parser.expression import ValueFactory
-from jaclang.parser.expression.value import ValueBranch
+from jaclang.generator.generator import ValueParameter, RegisterParameter, LabelParameter
+from jaclang.lexer import TokenStream, TokenKinds
+from jaclang.parser.expression.value import ValueBranch, ValueFactory
 from jaclang.parser.scope import BranchInScopeFactory, TokenExpectedException, BranchInScope, ScopeContext
 
 
 class IntegerBranch(ValueBranch):
-    def __init__(self, value: int):
+    # discarded are the values folded away, they are still generated for the errors they report
+    def __init__(self, value: int, discarded: Optional[list[ValueBranch]] = None):
         self.value = value
+        self.discarded = discarded if discarded is not None else []
 
     def printInfo(self, nested_level: int):
         print('    ' * nested_level, self.value)
 
-    def generateInstructions(self, _: ScopeContext) -> list[Instruction]:
-        return [Instructions.Mov(ValueParameter(self.value), Registers.RETURN)]
+    def isLoadable(self) -> bool:
+        return True
+
+    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        return self.generateInstructionsInto(context, Registers.RETURN)
+
+    def generateJump(self, context: ScopeContext, label: str, jump_if: bool) -> Iterator[Instruction]:
+        self.generateDiscarded(context)
+        if (self.value == 1) == jump_if:
+            yield Instructions.Jump(LabelParameter(label), None)
+
+    # the instructions are thrown away, only errors are reported
+    def generateDiscarded(self, context: ScopeContext):
+        for value in self.discarded:
+            for _ in value.generateInstructions(context):
+                pass
+
+    def generateInstructionsInto(self, context: ScopeContext, register: RegisterParameter) -> list[Instruction]:
+        self.generateDiscarded(context)
+        return [Instructions.Mov(ValueParameter(self.value), register)]
 
 
 class IntegerFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if type(tokens[pos]) is not ConstantToken:
-            raise TokenExpectedException(tokens[pos].pos, "Expected integer")
-        value = tokens[pos].value
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {TokenKinds.CONSTANT}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != TokenKinds.CONSTANT:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected integer")
+        value = tokens.getValue(pos)
         pos += 1
         return pos, IntegerBranch(value)
 
@@ -0,0 +1,304 @@
+from typing import Optional
+
+from jaclang.generator import Instruction, Instructions, Registers
+from jaclang.generator.generator import RegisterParameter
+from jaclang.lexer import Symbols
+from jaclang.parser.expression.expression import ExpressionBranch, OperandChain
+from jaclang.parser.expression.operators import Operator
+from jaclang.parser.expression.value import ValueBranch
+from jaclang.parser.function.call import FunctionCallBranch
+from jaclang.parser.function.return_statement import ReturnStatementBranch
+from jaclang.parser.integer import IntegerBranch
+from jaclang.parser.pointers import WriteBranch
+from jaclang.parser.scope import BranchInScope, ScopeBranch, ModifierBranchInScope, ScopeContext
+from jaclang.parser.variable.assignment import VariableAssignmentBranch, VariableData, GlobalVariableData
+from jaclang.parser.variable.declaration import VariableDeclarationBranch
+from jaclang.parser.variable.value import VariableBranch
+
+
+# a value computed before the loop, kept in a slot of the frame that locals promotion may put in a register
+class LoopValueBranch(ValueBranch):
+    def __init__(self, pos_on_stack: int):
+        self.pos_on_stack = pos_on_stack
+
+    def printInfo(self, nested_level: int):
+        print('    ' * nested_level, f"loop value: {self.pos_on_stack}")
+
+    def isLoadable(self) -> bool:
+        return True
+
+    def isSameValue(self, other: ValueBranch) -> bool:
+        return type(other) is LoopValueBranch and other.pos_on_stack == self.pos_on_stack
+
+    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        return self.generateInstructionsInto(context, Registers.RETURN)
+
+    def generateInstructionsInto(self, context: ScopeContext, register: RegisterParameter) -> list[Instruction]:
+        return [
+            Instructions.MemRead(Registers.STACK_BASE, self.pos_on_stack, register),
+        ]
+
+
+# stores a value into the slot of a loop value
+class LoopValueAssignmentBranch(BranchInScope):
+    def __init__(self, pos_on_stack: int, value: ValueBranch):
+        self.pos_on_stack = pos_on_stack
+        self.value = value
+
+    def printInfo(self, nested_level: int):
+        print('    ' * nested_level, f"loop value assignment: {self.pos_on_stack}")
+        self.value.printInfo(nested_level + 1)
+
+    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        return list(self.value.generateInstructions(context)) + [
+            Instructions.MemoryWrite(Registers.STACK_BASE, self.pos_on_stack, Registers.RETURN),
+        ]
+
+
+# local only changed by adding or subtracting constants in the loop, with the assignments doing so and their steps
+class InductionVariable:
+    def __init__(self, name: str):
+        self.name = name
+        self.steps: list[tuple[VariableAssignmentBranch, int]] = []
+
+
+# computes the expressions of a while loop that do not change in it once before the loop, and keeps products of
+# induction variables up to date by adding to them where the variable changes instead of multiplying every time
+# the expressions are not modified, ScopeContext.loop_values tells expressions what to generate instead of themselves
+class LoopOptimizer:
+    def __init__(self, context: ScopeContext, condition: ValueBranch, body: BranchInScope):
+        self.context = context
+        self.condition = condition
+        self.body = body
+        # names declared or assigned in the loop
+        self.changed_names: set[str] = set()
+        self.declared_names: set[str] = set()
+        self.assignments: dict[str, list[VariableAssignmentBranch]] = {}
+        self.values: list[ValueBranch] = []
+        # calls and writes may change any global variable
+        self.globals_changed = False
+        self.invariant: dict[ValueBranch, bool] = {}
+        # values and the slots they are stored into before the loop, in the order they are computed
+        self.preheader: list[LoopValueAssignmentBranch] = []
+        self.loop_values: dict[ValueBranch, ValueBranch] = {}
+        self.loop_updates: dict[VariableAssignmentBranch, list[BranchInScope]] = {}
+
+    # instructions computing the loop values, the loop is generated with them replacing the expressions afterwards
+    def optimize(self) -> list[Instruction]:
+        if not self.collectStatements():
+            return []
+        self.collectCalls()
+        induction_variables = self.findInductionVariables()
+
+        stack = list(reversed(self.values))
+        while stack:
+            value = stack.pop()
+            if type(value) is FunctionCallBranch:
+                stack += reversed(value.args)
+            if type(value) is not ExpressionBranch or value in self.context.loop_values or value in self.loop_values:
+                continue
+            if self.isInvariant(value):
+                self.hoist(value)
+                continue
+            stack += reversed(self.optimizeExpression(value, induction_variables))
+
+        instructions = []
+        for assignment in self.preheader:
+            instructions += assignment.generateInstructions(self.context)
+        self.context.loop_values.update(self.loop_values)
+        for assignment, updates in self.loop_updates.items():
+            self.context.loop_updates.setdefault(assignment, []).extend(updates)
+        return instructions
+
+    # the loop values only apply to the loop they were computed for
+    def finish(self):
+        for value in self.loop_values:
+            del self.context.loop_values[value]
+        for assignment, updates in self.loop_updates.items():
+            remaining = self.context.loop_updates[assignment][:-len(updates)]
+            if remaining:
+                self.context.loop_updates[assignment] = remaining
+            else:
+                del self.context.loop_updates[assignment]
+
+    # finds the values and assignments of the loop, False if it has a statement that is not known
+    def collectStatements(self) -> bool:
+        self.values.append(self.condition)
+        stack = [self.body]
+        while stack:
+            statement = stack.pop()
+            if type(statement) is ScopeBranch:
+                stack += reversed(statement.branches)
+            elif isinstance(statement, ModifierBranchInScope):
+                # if and while statements, the condition is evaluated in the loop as well
+                self.values.append(statement.condition)
+                stack.append(statement.branch)
+            elif type(statement) is WriteBranch:
+                self.globals_changed = True
+                self.values += [statement.address, statement.value]
+            elif type(statement) is VariableDeclarationBranch:
+                self.changed_names.add(statement.variable_name)
+                self.declared_names.add(statement.variable_name)
+                stack.append(statement.assignment)
+            elif type(statement) is VariableAssignmentBranch:
+                self.changed_names.add(statement.variable_name)
+                self.assignments.setdefault(statement.variable_name, []).append(statement)
+                if statement.value is not None:
+                    self.values.append(statement.value)
+            elif type(statement) is ReturnStatementBranch:
+                if statement.value is not None:
+                    self.values.append(statement.value)
+            elif isinstance(statement, ValueBranch):
+                self.values.append(statement)
+            else:
+                return False
+        return True
+
+    def collectCalls(self):
+        stack = list(self.values)
+        while stack:
+            value = stack.pop()
+            if type(value) is ExpressionBranch:
+                stack += [value.value1, value.value2]
+            elif type(value) is FunctionCallBranch:
+                self.globals_changed = True
+                stack += value.args
+
+    # a local declared outside of the loop and only assigned itself plus or minus a constant in it
+    def findInductionVariables(self) -> dict[str, InductionVariable]:
+        induction_variables = {}
+        for name, assignments in self.assignments.items():
+            if name in self.declared_names or type(self.context.symbols.get(name)) is not VariableData:
+                continue
+            variable = InductionVariable(name)
+            for assignment in assignments:
+                step = self.getStep(name, assignment.value)
+                if step is None:
+                    break
+                variable.steps.append((assignment, step))
+            else:
+                induction_variables[name] = variable
+        return induction_variables
+
+    @staticmethod
+    def getStep(name: str, value: Optional[ValueBranch]) -> Optional[int]:
+        if type(value) is not ExpressionBranch or type(value.value1) is not VariableBranch or \
+                value.value1.variable_name != name or type(value.value2) is not IntegerBranch or value.value2.discarded:
+            return None
+        if value.expr_operator is Operator.operators[Symbols.PLUS]:
+            return value.value2.value
+        if value.expr_operator is Operator.operators[Symbols.MINUS]:
+            return -value.value2.value
+        return None
+
+    # values are walked with a stack of their own, as a long expression of an operator that is not associative can
+    # be nested deeper than the recursion limit
+    def isInvariant(self, root: ValueBranch) -> bool:
+        stack = [root]
+        while stack:
+            value = stack[-1]
+            if value in self.invariant:
+                stack.pop()
+                continue
+            if type(value) is not ExpressionBranch:
+                self.invariant[value] = self.isInvariantLeaf(value)
+                stack.pop()
+            elif value.value1 in self.invariant and value.value2 in self.invariant:
+                self.invariant[value] = self.invariant[value.value1] and self.invariant[value.value2] and \
+                    not value.hasSideEffects() and value not in self.context.loop_values
+                stack.pop()
+            else:
+                stack += [value.value1, value.value2]
+        return self.invariant[root]
+
+    def isInvariantLeaf(self, value: ValueBranch) -> bool:
+        if type(value) is IntegerBranch:
+            return not value.discarded
+        if type(value) is LoopValueBranch:
+            return True
+        if type(value) is not VariableBranch or value.variable_name in self.changed_names:
+            return False
+        symbol = self.context.symbols.get(value.variable_name)
+        return type(symbol) is VariableData or (type(symbol) is GlobalVariableData and not self.globals_changed)
+
+    def hoist(self, value: ValueBranch) -> LoopValueBranch:
+        loop_value = LoopValueBranch(self.context.stack_manager.allocate())
+        self.preheader.append(LoopValueAssignmentBranch(loop_value.pos_on_stack, value))
+        self.loop_values[value] = loop_value
+        return loop_value
+
+    # replaces the expression if it can be computed with less work in the loop, returns the operands that are
+    # still generated in the loop
+    def optimizeExpression(self, value: ExpressionBranch,
+                           induction_variables: dict[str, InductionVariable]) -> list[ValueBranch]:
+        expr_operator = value.expr_operator
+        operands = [value.value1, value.value2]
+        if expr_operator.associative and not value.hasSideEffects():
+            operands = self.getChainOperands(value)
+            invariant = [operand for operand in operands if self.isInvariant(operand)]
+            if len(invariant) >= 2:
+                # the operands that do not change are regrouped, so they are computed together before the loop
+                operands = [operand for operand in operands if not self.isInvariant(operand)]
+                hoisted = self.hoist(OperandChain(expr_operator, invariant).intoBranch())
+                self.loop_values[value] = OperandChain(expr_operator, operands + [hoisted]).intoBranch()
+                if expr_operator is Operator.operators[Symbols.MULTIPLY] and len(operands) == 1 and \
+                        self.reduceInduction(value, operands[0], hoisted, induction_variables):
+                    return []
+                return operands
+
+        if expr_operator is Operator.operators[Symbols.MULTIPLY]:
+            for variable, factor in ((value.value1, value.value2), (value.value2, value.value1)):
+                if type(factor) is ExpressionBranch and self.isInvariant(factor):
+                    factor = self.hoist(factor)
+                if self.reduceInduction(value, variable, factor, induction_variables):
+                    return []
+        return operands
+
+    # operands of the run of the same operator the expression is the top of
+    def getChainOperands(self, value: ExpressionBranch) -> list[ValueBranch]:
+        operands = []
+        stack = [value.value2, value.value1]
+        while stack:
+            operand = stack.pop()
+            if type(operand) is ExpressionBranch and operand.expr_operator is value.expr_operator and \
+                    operand not in self.context.loop_values:
+                stack += [operand.value2, operand.value1]
+            else:
+                operands.append(operand)
+        return operands
+
+    # the product of an induction variable and a factor that does not change is kept in a slot, which gets the step
+    # times the factor added wherever the variable gets the step added
+    def reduceInduction(self, value: ExpressionBranch, variable: ValueBranch, factor: ValueBranch,
+                        induction_variables: dict[str, InductionVariable]) -> bool:
+        if type(variable) is not VariableBranch or variable.variable_name not in induction_variables or \
+                not self.isInvariant(factor):
+            return False
+        induction_variable = induction_variables[variable.variable_name]
+        steps = [step for _, step in induction_variable.steps]
+        if type(factor) is IntegerBranch:
+            # multiplying by a power of two is a shift, which is as fast as adding
+            if factor.value & (factor.value - 1) == 0:
+                return False
+            increments = [self.getIncrement(step * factor.value) for step in steps]
+            if None in increments:
+                return False
+        elif all(abs(step) == 1 for step in steps):
+            increments = [(Operator.operators[Symbols.PLUS if step == 1 else Symbols.MINUS], factor) for step in steps]
+        else:
+            return False
+
+        multiply = Operator.operators[Symbols.MULTIPLY]
+        product = self.hoist(ExpressionBranch(variable, multiply, factor))
+        self.loop_values[value] = product
+        for (assignment, _), (increment_operator, increment) in zip(induction_variable.steps, increments):
+            self.loop_updates.setdefault(assignment, []).append(LoopValueAssignmentBranch(
+                product.pos_on_stack, ExpressionBranch(product, increment_operator, increment)))
+        return True
+
+    @staticmethod
+    def getIncrement(increment: int) -> Optional[tuple[Operator, IntegerBranch]]:
+        increment_operator = Operator.operators[Symbols.PLUS if increment >= 0 else Symbols.MINUS]
+        if increment_operator.fold(0, abs(increment)) is None:
+            return None
+        return increment_operator, IntegerBranch(abs(increment))
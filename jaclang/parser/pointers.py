@@ -1,5 +1,7 @@
+from typing import Optional
+
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.lexer import Keywords, Token
+from jaclang.lexer import Keywords, TokenStream
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.scope import BranchInScope, BranchInScopeFactory, ScopeFactory, ScopeContext, TokenExpectedException
@@ -11,7 +13,7 @@ class WriteBranch(BranchInScope):
         self.value = value
 
     def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        instructions = self.address.generateInstructions(context)
+        instructions = list(self.address.generateInstructions(context))
         instructions += [
             Instructions.Push(Registers.RETURN),
         ]
@@ -32,9 +34,12 @@ class WriteBranch(BranchInScope):
 
 
 class WriteFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if tokens[pos] is not Keywords.WRITE:
-            raise TokenExpectedException(tokens[pos].pos, "Expected write keyword")
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.WRITE}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != Keywords.WRITE:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected write keyword")
 
         pos += 1
 
@@ -1,5 +1,8 @@
+from typing import Optional
+
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.lexer import Token, Keywords
+from jaclang.generator.generator import RegisterParameter
+from jaclang.lexer import TokenStream, Keywords
 from jaclang.parser.expression import ValueFactory
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.scope import BranchInScopeFactory, TokenExpectedException, BranchInScope, ScopeContext
@@ -12,16 +15,30 @@ class ReceiveKeyBranch(ValueBranch):
     def printInfo(self, nested_level: int):
         print('    ' * nested_level, "receive_key")
 
-    def generateInstructions(self, _: ScopeContext) -> list[Instruction]:
+    def hasSideEffects(self) -> bool:
+        return True
+
+    def isLoadable(self) -> bool:
+        return True
+
+    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+        return self.generateInstructionsInto(context, Registers.RETURN)
+
+    def generateInstructionsInto(self, _: ScopeContext, register: RegisterParameter) -> list[Instruction]:
         return [
-            Instructions.ReceiveKey(Registers.RETURN)
+            Instructions.ReceiveKey(register)
         ]
 
 
 class ReceiveKeyFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if tokens[pos] is not Keywords.RECV_KEY:
-            raise TokenExpectedException(tokens[pos].pos, "Expected receive_key")
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.RECV_KEY}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != Keywords.RECV_KEY:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected receive_key")
         pos += 1
         return pos, ReceiveKeyBranch()
 
@@ -1,9 +1,10 @@
 from abc import abstractmethod
+from typing import Optional, Iterable, Iterator
 
-from jaclang.error.syntax_error import JaclangSyntaxError
+from jaclang.error.syntax_error import JaclangSyntaxError, ErrorCollector
 from jaclang.generator import Instruction, Instructions, Registers
 from jaclang.generator.generator import ValueParameter
-from jaclang.lexer import Token, EndToken
+from jaclang.lexer import TokenStream, TokenKinds, Keywords
 
 
 class SymbolData:
@@ -20,10 +21,70 @@ class IdManager:
         return result
 
 
+# one dict holds the visible symbol for every name, every scope remembers what its declarations shadowed
+# so entering and leaving a scope never copies the table and lookups do not depend on nesting depth
+class SymbolTable:
+    def __init__(self):
+        self.symbols: dict[str, SymbolData] = {}
+        self.scopes: list[list[tuple[str, Optional[SymbolData]]]] = [[]]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.symbols
+
+    def __getitem__(self, name: str) -> SymbolData:
+        return self.symbols[name]
+
+    def get(self, name: str) -> Optional[SymbolData]:
+        return self.symbols.get(name)
+
+    def declare(self, name: str, symbol: SymbolData):
+        self.scopes[-1].append((name, self.symbols.get(name)))
+        self.symbols[name] = symbol
+
+    # a table with only the symbols of the outermost scope, as code outside of every function sees them
+    def getRootTable(self) -> "SymbolTable":
+        # the outermost scope that shadowed a name remembers what it meant in the outermost scope
+        outer_symbols = {}
+        for scope in reversed(self.scopes[1:]):
+            for name, shadowed in reversed(scope):
+                outer_symbols[name] = shadowed
+        table = SymbolTable()
+        for name, _ in self.scopes[0]:
+            table.declare(name, outer_symbols[name] if name in outer_symbols else self.symbols[name])
+        return table
+
+    def pushScope(self):
+        self.scopes.append([])
+
+    def popScope(self):
+        for name, shadowed in reversed(self.scopes.pop()):
+            if shadowed is None:
+                del self.symbols[name]
+            else:
+                self.symbols[name] = shadowed
+
+
+# functions whose code is left out, counted for the stats of the IR optimizer
+class RemovedFunctions:
+    def __init__(self):
+        self.functions = 0
+        self.instructions = 0
+
+
 class RootContext:
-    def __init__(self, symbols: dict[str, SymbolData], id_manager: IdManager):
+    def __init__(self, symbols: SymbolTable, id_manager: IdManager, errors: Optional[ErrorCollector] = None,
+                 inliner=None, used_functions: Optional[set[str]] = None,
+                 removed_functions: Optional[RemovedFunctions] = None):
         self.symbols = symbols
         self.id_manager = id_manager
+        # errors in statements are reported here and generation goes on, None means they are raised
+        self.errors = errors
+        # decides which calls are inlined, no call is if None
+        self.inliner = inliner
+        # functions whose code is emitted, the others are still generated for their errors and size, all are if None
+        self.used_functions = used_functions
+        # counts the functions whose code is left out if given
+        self.removed_functions = removed_functions
         self.global_variable_space_size = 0
 
     def allocate_global_variable(self):
@@ -33,7 +94,11 @@ class RootContext:
 
 class BranchInRoot:
     @abstractmethod
-    def generateInstructions(self, context: RootContext) -> list[Instruction]:
+    def generateInstructions(self, context: RootContext) -> Iterable[Instruction]:
+        pass
+
+    # registers the symbols the start code needs before any instruction is generated
+    def declareSymbols(self, context: RootContext):
         pass
 
     @abstractmethod
@@ -43,12 +108,48 @@ class BranchInRoot:
 
 class BranchInRootFactory:
     @abstractmethod
-    def parse(self, pos: int, tokens: list[Token]) -> (int, BranchInRoot):
+    def parse(self, pos: int, tokens: TokenStream) -> (int, BranchInRoot):
         pass
 
+    # token kinds the branch can begin with, None means it has to be tried on any token
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return None
+
+
+# groups registered factories by the token kind they can begin with, keeping their order
+class FactoryDispatcher:
+    def __init__(self, factories: list):
+        self.factories = factories
+        self.indexed_factories = -1
+        self.candidates: dict[int, list] = {}
+        self.fallback: list = []
+        self.leading_kinds: Optional[set[int]] = None
+
+    def update(self):
+        if self.indexed_factories == len(self.factories):
+            return
+        self.indexed_factories = len(self.factories)
+
+        factory_kinds = [(factory, factory.getLeadingKinds()) for factory in self.factories]
+        self.fallback = [factory for factory, kinds in factory_kinds if kinds is None]
+        all_kinds = set().union(*(kinds for _, kinds in factory_kinds if kinds is not None))
+        self.candidates = {
+            kind: [factory for factory, kinds in factory_kinds if kinds is None or kind in kinds] for kind in all_kinds
+        }
+
+        self.leading_kinds = None if self.fallback else set(self.candidates.keys())
+
+    def getCandidates(self, kind: int) -> list:
+        self.update()
+        return self.candidates.get(kind, self.fallback)
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        self.update()
+        return self.leading_kinds
+
 
 class InitGenerator:
-    def generateInitInstructions(self, context: RootContext) -> list[Instruction]:
+    def generateInitInstructions(self, context: RootContext) -> Iterable[Instruction]:
         return []
 
 
@@ -62,40 +163,62 @@ class RootBranch:
         for branch in self.branches:
             branch.printInfo(nested_level)
 
-    def generateInstructions(self) -> list[Instruction]:
-        instructions = []
+    def generateInstructions(self, errors: Optional[ErrorCollector] = None, inliner=None,
+                             used_functions: Optional[set[str]] = None,
+                             removed_functions: Optional[RemovedFunctions] = None) -> Iterator[Instruction]:
+        id_manager = IdManager()
 
-        context = RootContext({}, IdManager())
+        # the start code comes first, so globals and functions are declared in a separate pass
+        declarations = RootContext(SymbolTable(), id_manager, errors)
         for branch in self.branches:
-            instructions += branch.generateInstructions(context)
-
-        start_instructions = [
-            Instructions.Mov(ValueParameter(context.global_variable_space_size), Registers.STACK_TOP)
-        ]
+            branch.declareSymbols(declarations)
 
+        yield Instructions.Mov(ValueParameter(declarations.global_variable_space_size), Registers.STACK_TOP)
         for generator in self.init_generators:
-            start_instructions += generator.generateInitInstructions(context)
-
-        start_instructions += [
-            Instructions.Halt()
-        ]
-
-        return start_instructions + instructions
+            try:
+                init_instructions = generator.generateInitInstructions(declarations)
+            except JaclangSyntaxError as error:
+                if errors is None:
+                    raise
+                errors.report(error)
+                continue
+            yield from init_instructions
+        yield Instructions.Halt()
+
+        # symbols are declared again while generating, so they still have to be declared before use
+        context = RootContext(SymbolTable(), id_manager, errors, inliner, used_functions, removed_functions)
+        for branch in self.branches:
+            yield from branch.generateInstructions(context)
 
 
 class RootFactory:
     factories = []
+    dispatcher = FactoryDispatcher(factories)
 
     @staticmethod
-    def parse(pos: int, tokens: list[Token]) -> (int, RootBranch):
+    def parse(pos: int, tokens: TokenStream, errors: Optional[ErrorCollector] = None) -> (int, RootBranch):
         branches = []
-        while tokens[pos] != EndToken():
-            for factory in RootFactory.factories:
-                pos, branch = factory.parse(pos, tokens)
-                if branch is not None:
-                    branches.append(branch)
-                    break
-            else:
-                raise JaclangSyntaxError(tokens[pos].pos, "Unrecognized statement")
+        while tokens[pos] != TokenKinds.END:
+            begin_pos = pos
+            try:
+                for factory in RootFactory.dispatcher.getCandidates(tokens[pos]):
+                    pos, branch = factory.parse(pos, tokens)
+                    if branch is not None:
+                        branches.append(branch)
+                        break
+                else:
+                    raise JaclangSyntaxError(tokens.getPos(pos), "Unrecognized statement")
+            except JaclangSyntaxError as error:
+                if errors is None:
+                    raise
+                errors.report(error)
+                pos = RootFactory.recover(begin_pos + 1, tokens)
 
         return pos, RootBranch(branches)
+
+    # functions can not be nested, so the next func keyword always begins a new root statement
+    @staticmethod
+    def recover(pos: int, tokens: TokenStream) -> int:
+        while tokens[pos] != TokenKinds.END and tokens[pos] != Keywords.FUNC:
+            pos += 1
+        return pos
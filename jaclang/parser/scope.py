@@ -1,10 +1,10 @@
 from abc import abstractmethod, ABC
-from copy import copy
+from typing import Optional, Iterator, Iterable
 
-from jaclang.error.syntax_error import JaclangSyntaxError
+from jaclang.error.syntax_error import JaclangSyntaxError, ErrorCollector
 from jaclang.generator import Instruction
-from jaclang.lexer import Token, Symbols, EndToken
-from jaclang.parser.root import SymbolData, RootContext, IdManager
+from jaclang.lexer import TokenStream, Symbols, TokenKinds, TokenKind, KeywordKind, Keywords
+from jaclang.parser.root import SymbolTable, RootContext, IdManager, FactoryDispatcher
 
 
 class StackManager:
@@ -20,46 +20,156 @@ class StackManager:
 
 
 class ScopeContext(RootContext):
-    def __init__(self, symbols: dict[str, SymbolData], id_manager: IdManager, stack_manager: StackManager, curr_function: str):
-        super().__init__(symbols, id_manager)
+    def __init__(self, symbols: SymbolTable, id_manager: IdManager, stack_manager: StackManager, curr_function: str,
+                 errors: Optional[ErrorCollector] = None, inliner=None):
+        super().__init__(symbols, id_manager, errors, inliner)
         self.stack_manager = stack_manager
         self.curr_function = curr_function
+        # return statements jump here, the end of the body if the function is being inlined
+        self.return_label = f"func_{curr_function}_return"
+        # whether the body is inlined at a call, its returns then can not be tail calls
+        self.inlined = False
+        # arguments of the function, a tail call takes them off the stack
+        self.args_num = 0
+        # while loops compute some values before the loop, the expressions generate these values instead
+        self.loop_values: dict[BranchInScope, BranchInScope] = {}
+        # and assignments keep the values that depend on the variable they change up to date
+        self.loop_updates: dict[BranchInScope, list[BranchInScope]] = {}
+
+
+# wraps the iterator of a sub-branch, so flattenNested can walk it with its own stack instead of recursing
+class Nested:
+    def __init__(self, iterator: Iterator):
+        self.iterator = iterator
+
+
+# if errors are collected, a branch that raises one is dropped and the ones around it carry on
+def flattenNested(iterator: Iterator, errors: Optional[ErrorCollector] = None) -> Iterator:
+    stack = [iterator]
+    while stack:
+        try:
+            item = next(stack[-1], None)
+        except JaclangSyntaxError as error:
+            if errors is None:
+                raise
+            errors.report(error)
+            item = None
+
+        if item is None:
+            stack.pop()
+        elif type(item) is Nested:
+            stack.append(item.iterator)
+        else:
+            yield item
 
 
 class BranchInScope:
     @abstractmethod
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+    def generateInstructions(self, context: ScopeContext) -> Iterable[Instruction]:
         pass
 
     @abstractmethod
     def printInfo(self, nested_level: int):
         pass
 
+    # branches that contain other branches override these two and yield Nested for their sub-branches
+    def generateNestedInstructions(self, context: ScopeContext) -> Iterator:
+        yield from self.generateInstructions(context)
+
+    def printNestedInfo(self, nested_level: int) -> Iterator:
+        self.printInfo(nested_level)
+        yield from ()
+
 
 # modifier branch is a branch that affects execution of the next branch such as if statement
 class ModifierBranchInScope(BranchInScope, ABC):
     def __init__(self):
         self.branch: BranchInScope
 
+    def generateInstructions(self, context: ScopeContext) -> Iterator[Instruction]:
+        return flattenNested(self.generateNestedInstructions(context), context.errors)
+
+    def printInfo(self, nested_level: int):
+        for _ in flattenNested(self.printNestedInfo(nested_level)):
+            pass
+
 
 class BranchInScopeFactory:
+    # set by parse() for the duration of one parse if packrat parsing is enabled
+    packrat_cache: Optional["PackratCache"] = None
+    # set by parse() to keep parsing after a broken statement, errors are raised right away if None
+    error_collector: Optional[ErrorCollector] = None
+    # only factories whose branches are never modified after parsing can share results
+    memoizable = False
+
     @abstractmethod
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         pass
 
-    def parseExpect(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    # the cache is checked here and not in a method of its own, so parsing without it adds no frames to the recursion
+    def parseExpect(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         try:
+            if self.memoizable and BranchInScopeFactory.packrat_cache is not None:
+                return BranchInScopeFactory.packrat_cache.parse(self, pos, tokens)
             return self.parseImpl(pos, tokens)
         except TokenExpectedException as exception:
             raise TokenNeededException(exception.pos, exception.message)
 
-    def parseDontExpect(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    # token kinds the branch can begin with, None means it has to be tried on any token
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return None
+
+    def parseDontExpect(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        leading_kinds = self.getLeadingKinds()
+        if leading_kinds is not None and tokens[pos] not in leading_kinds:
+            return pos, None
+
         try:
+            if self.memoizable and BranchInScopeFactory.packrat_cache is not None:
+                return BranchInScopeFactory.packrat_cache.parse(self, pos, tokens)
             return self.parseImpl(pos, tokens)
         except TokenExpectedException as _:
             return pos, None
 
 
+# remembers the result or failure of every memoizable factory at every position it was tried on
+class PackratCache:
+    def __init__(self):
+        self.factory_slots: dict[type, int] = {}
+        # keyed by position and factory slot, holds (pos, branch) or the TokenExpectedException raised
+        self.entries: dict[tuple[int, int], object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, factory: BranchInScopeFactory, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        slot = self.factory_slots.setdefault(type(factory), len(self.factory_slots))
+        key = (pos, slot)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            try:
+                entry = factory.parseImpl(pos, tokens)
+            except TokenExpectedException as exception:
+                entry = exception
+            self.entries[key] = entry
+        else:
+            self.hits += 1
+
+        if isinstance(entry, TokenExpectedException):
+            raise TokenExpectedException(entry.pos, entry.message)
+        return entry
+
+    def printStats(self):
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups != 0 else 0
+        print("Packrat cache:")
+        print("---------------------------------")
+        print(f"lookups: {lookups}, hits: {self.hits}, misses: {self.misses}, hit rate: {hit_rate:.1f}%")
+        print(f"entries: {len(self.entries)}")
+        print("---------------------------------")
+
+
 # Parser did not recognize branch type (throws if you need to have a branch present somewhere)
 class TokenExpectedException(JaclangSyntaxError):
     pass
@@ -75,50 +185,125 @@ class ScopeBranch(BranchInScope):
         self.branches = branches
 
     def printInfo(self, nested_level: int):
+        for _ in flattenNested(self.printNestedInfo(nested_level)):
+            pass
+
+    def printNestedInfo(self, nested_level: int) -> Iterator:
         print('    ' * nested_level, "scope:")
         for branch in self.branches:
-            branch.printInfo(nested_level + 1)
+            yield Nested(branch.printNestedInfo(nested_level + 1))
+
+    def generateInstructions(self, context: ScopeContext) -> Iterator[Instruction]:
+        return flattenNested(self.generateNestedInstructions(context), context.errors)
 
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        copied_context = context
-        copied_context.symbols = copy(context.symbols)
-        instructions = []
+    def generateNestedInstructions(self, context: ScopeContext) -> Iterator:
+        context.symbols.pushScope()
         for branch in self.branches:
-            instructions += branch.generateInstructions(copied_context)
-        return instructions
+            yield Nested(branch.generateNestedInstructions(context))
+        context.symbols.popScope()
 
 
 class ScopeFactory(BranchInScopeFactory):
     factories = []
+    dispatcher = FactoryDispatcher(factories)
 
     @staticmethod
-    def parseStatement(pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        for factory in ScopeFactory.factories:
+    def parseStatement(pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        return ScopeFactory.parseNested(pos, tokens, None)
+
+    # parses a statement without its sub-statements, returns None as branch if a nested scope opens at pos
+    @staticmethod
+    def parseStatementHead(pos: int, tokens: TokenStream) -> (int, Optional[BranchInScope]):
+        for factory in ScopeFactory.dispatcher.getCandidates(tokens[pos]):
+            if type(factory) is ScopeFactory:
+                return pos + 1, None
+
             pos, branch = factory.parseDontExpect(pos, tokens)
             if branch is not None:
-                if issubclass(type(branch), ModifierBranchInScope):
-                    pos, subbranch = ScopeFactory.parseStatement(pos, tokens)
-                    branch.branch = subbranch
-
                 return pos, branch
 
-        if tokens[pos] == EndToken():
-            raise TokenNeededException(tokens[pos].pos, "Expected '}' at the end of scope")
+        if tokens[pos] == TokenKinds.END:
+            raise TokenNeededException(tokens.getPos(pos), "Expected '}' at the end of scope")
         else:
-            raise TokenNeededException(tokens[pos].pos, "Did not recognize statement")
+            raise TokenNeededException(tokens.getPos(pos), "Did not recognize statement")
 
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    # nested scopes and modifiers are kept on an explicit stack, so nesting depth is not limited by recursion
+    @staticmethod
+    def parseNested(pos: int, tokens: TokenStream, branches: Optional[list[BranchInScope]]) -> (int, BranchInScope):
+        # every frame has the branches of an open scope (None for a single statement)
+        # and the modifiers still waiting for the statement they apply to
+        frames = [(branches, [])]
+        while True:
+            branches, modifiers = frames[-1]
+            if branches is not None and not modifiers and tokens[pos] == Symbols.RIGHT_BRACE:
+                pos += 1
+                frames.pop()
+                statement = ScopeBranch(branches)
+                if not frames:
+                    return pos, statement
+            else:
+                try:
+                    pos, statement = ScopeFactory.parseStatementHead(pos, tokens)
+                except JaclangSyntaxError as error:
+                    if branches is None or BranchInScopeFactory.error_collector is None:
+                        raise
+                    pos = ScopeFactory.recover(pos, tokens, error)
+                    modifiers.clear()
+                    continue
+                if statement is None:
+                    frames.append(([], []))
+                    continue
+                if isinstance(statement, ModifierBranchInScope):
+                    modifiers.append(statement)
+                    continue
+
+            branches, modifiers = frames[-1]
+            while modifiers:
+                modifier = modifiers.pop()
+                modifier.branch = statement
+                statement = modifier
+
+            if branches is None:
+                return pos, statement
+            branches.append(statement)
+
+    # reports the error of a broken statement and skips to a '}' or keyword outside any braces it opened
+    @staticmethod
+    def recover(pos: int, tokens: TokenStream, error: JaclangSyntaxError) -> int:
+        if tokens[pos] == TokenKinds.END:
+            raise error
+        if tokens[pos] == Keywords.FUNC:
+            # the statement that broke is the next function, so the scope was never closed
+            raise TokenNeededException(tokens.getPos(pos), "Expected '}' at the end of scope")
+        BranchInScopeFactory.error_collector.report(error)
+
+        if tokens[pos] != Symbols.RIGHT_BRACE:
+            pos += 1
+        depth = 0
+        while True:
+            kind = tokens[pos]
+            if kind == TokenKinds.END:
+                return pos
+            if kind == Keywords.FUNC:
+                # the scope was never closed, its function has to be left for the next one
+                raise TokenNeededException(tokens.getPos(pos), "Expected '}' at the end of scope")
+            if depth == 0 and (kind == Symbols.RIGHT_BRACE or isinstance(TokenKind.kinds[kind], KeywordKind)):
+                return pos
+
+            if kind == Symbols.LEFT_BRACE:
+                depth += 1
+            elif kind == Symbols.RIGHT_BRACE:
+                depth -= 1
+            pos += 1
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Symbols.LEFT_BRACE}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         if pos >= len(tokens) or tokens[pos] != Symbols.LEFT_BRACE:
-            raise TokenExpectedException(tokens[pos].pos, "Expected '{' at beginning of scope")
-        pos += 1
-
-        branches = []
-        while tokens[pos] != Symbols.RIGHT_BRACE:
-            pos, branch = self.parseStatement(pos, tokens)
-            branches.append(branch)
-        pos += 1
+            raise TokenExpectedException(tokens.getPos(pos), "Expected '{' at beginning of scope")
 
-        return pos, ScopeBranch(branches)
+        return self.parseNested(pos + 1, tokens, [])
 
 
 def load():
@@ -3,7 +3,7 @@ from typing import Optional
 from jaclang.error.syntax_error import JaclangSyntaxError
 from jaclang.generator import Instruction, Registers, Instructions
 from jaclang.generator.generator import ValueParameter
-from jaclang.lexer import IdentifierToken, Token, Symbols
+from jaclang.lexer import TokenKinds, TokenStream, Symbols
 from jaclang.parser.expression.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.root import SymbolData
@@ -21,13 +21,14 @@ class GlobalVariableData(SymbolData):
 
 
 class VariableAssignmentBranch(BranchInScope):
-    def __init__(self, variable_name: str, value: Optional[ValueBranch]):
+    def __init__(self, variable_name: str, value: Optional[ValueBranch], pos: int = -1):
         self.variable_name = variable_name
         self.value = value
+        self.pos = pos
 
     def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        if self.variable_name not in context.symbols.keys():
-            raise JaclangSyntaxError(-1, f"Variable '{self.variable_name}' not found")
+        if self.variable_name not in context.symbols:
+            raise JaclangSyntaxError(self.pos, f"Variable '{self.variable_name}' not found")
         variable_obj = context.symbols[self.variable_name]
         instructions = []
         if self.value is not None:
@@ -43,8 +44,10 @@ class VariableAssignmentBranch(BranchInScope):
                     Instructions.MemoryWrite(ValueParameter(variable_obj.pos_in_mem), 0, Registers.RETURN),
                 ]
         else:
-            raise JaclangSyntaxError(-1, f"Label '{self.variable_name}' is not a variable")
+            raise JaclangSyntaxError(self.pos, f"Label '{self.variable_name}' is not a variable")
 
+        for update in context.loop_updates.get(self, []):
+            instructions += update.generateInstructions(context)
         return instructions
 
     def printInfo(self, nested_level: int):
@@ -55,15 +58,19 @@ class VariableAssignmentBranch(BranchInScope):
 
 
 class VariableAssignmentFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if type(tokens[pos]) is not IdentifierToken:
-            raise TokenExpectedException(tokens[pos].pos, "Expected variable name after var keyword")
-        variable_name = tokens[pos].identifier
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {TokenKinds.IDENTIFIER}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected variable name after var keyword")
+        variable_name = tokens.getIdentifier(pos)
+        begin_pos = tokens.getPos(pos)
 
         pos += 1
         if tokens[pos] != Symbols.ASSIGNMENT:
-            raise TokenExpectedException(tokens[pos].pos, "Expected '='")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected '='")
         pos += 1
         expression_factory = ExpressionFactory()
         pos, value = expression_factory.parseExpect(pos, tokens)
-        return pos, VariableAssignmentBranch(variable_name, value)
+        return pos, VariableAssignmentBranch(variable_name, value, begin_pos)
@@ -2,7 +2,7 @@ from typing import Optional
 
 from jaclang.error.syntax_error import JaclangSyntaxError
 from jaclang.generator import Instruction
-from jaclang.lexer import Token, Keywords, IdentifierToken, Symbols
+from jaclang.lexer import TokenStream, Keywords, TokenKinds, Symbols
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.root import BranchInRootFactory, BranchInRoot, RootContext
@@ -12,13 +12,13 @@ from jaclang.parser.variable.assignment import VariableAssignmentBranch, GlobalV
 
 
 class VariableDeclarationBranch(BranchInScope):
-    def __init__(self, variable_name: str, value: Optional[ValueBranch]):
+    def __init__(self, variable_name: str, value: Optional[ValueBranch], pos: int = -1):
         self.variable_name = variable_name
-        self.assignment = VariableAssignmentBranch(variable_name, value)
+        self.assignment = VariableAssignmentBranch(variable_name, value, pos)
 
     def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
         pos_on_stack = context.stack_manager.allocate()
-        context.symbols[self.variable_name] = VariableData(pos_on_stack)
+        context.symbols.declare(self.variable_name, VariableData(pos_on_stack))
 
         instructions = []
         if self.assignment is not None:
@@ -28,37 +28,43 @@ class VariableDeclarationBranch(BranchInScope):
     def printInfo(self, nested_level: int):
         print('    ' * nested_level, "VariableDeclaration:")
         print('    ' * nested_level, f"    name: {self.variable_name}")
-        if self.assignment is not None:
+        if self.assignment.value is not None:
             self.assignment.value.printInfo(nested_level + 1)
 
 
 class VariableDeclarationFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.VAR}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         if tokens[pos] != Keywords.VAR:
-            raise TokenExpectedException(tokens[pos].pos, "Expected var keyword")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected var keyword")
 
         pos += 1
-        if type(tokens[pos]) is not IdentifierToken:
-            raise TokenNeededException(tokens[pos].pos, "Expected variable name after var keyword")
-        variable_name = tokens[pos].identifier
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise TokenNeededException(tokens.getPos(pos), "Expected variable name after var keyword")
+        variable_name = tokens.getIdentifier(pos)
+        begin_pos = tokens.getPos(pos)
 
         pos += 1
         if tokens[pos] == Symbols.ASSIGNMENT:
             pos += 1
             expression_factory = ExpressionFactory()
             pos, value = expression_factory.parseExpect(pos, tokens)
-            return pos, VariableDeclarationBranch(variable_name, value)
+            return pos, VariableDeclarationBranch(variable_name, value, begin_pos)
         else:
-            return pos, VariableDeclarationBranch(variable_name, None)
+            return pos, VariableDeclarationBranch(variable_name, None, begin_pos)
 
 
 class GlobalVariableDeclarationBranch(BranchInRoot):
     def __init__(self, variable_name: str):
         self.variable_name = variable_name
 
-    def generateInstructions(self, context: RootContext) -> list[Instruction]:
-        context.symbols[self.variable_name] = GlobalVariableData(context.allocate_global_variable())
+    def declareSymbols(self, context: RootContext):
+        context.symbols.declare(self.variable_name, GlobalVariableData(context.allocate_global_variable()))
 
+    def generateInstructions(self, context: RootContext) -> list[Instruction]:
+        self.declareSymbols(context)
         return []
 
     def printInfo(self, nested_level: int):
@@ -67,14 +73,17 @@ class GlobalVariableDeclarationBranch(BranchInRoot):
 
 
 class GlobalVariableDeclarationFactory(BranchInRootFactory):
-    def parse(self, pos: int, tokens: list[Token]) -> (int, BranchInRoot):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.VAR}
+
+    def parse(self, pos: int, tokens: TokenStream) -> (int, BranchInRoot):
         if tokens[pos] != Keywords.VAR:
             return pos, None
 
         pos += 1
-        if type(tokens[pos]) is not IdentifierToken:
-            raise JaclangSyntaxError(tokens[pos].pos, "Expected variable name after var keyword")
-        variable_name = tokens[pos].identifier
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise JaclangSyntaxError(tokens.getPos(pos), "Expected variable name after var keyword")
+        variable_name = tokens.getIdentifier(pos)
 
         pos += 1
 
@@ -1,39 +1,57 @@
+from typing import Optional
+
 from jaclang.error.syntax_error import JaclangSyntaxError
 from jaclang.generator import Instruction, Instructions, Registers
-from jaclang.generator.generator import ValueParameter
-from jaclang.lexer import Token, IdentifierToken
+from jaclang.generator.generator import ValueParameter, RegisterParameter
+from jaclang.lexer import TokenStream, TokenKinds
 from jaclang.parser.expression.value import ValueBranch
 from jaclang.parser.scope import ScopeContext, BranchInScopeFactory, BranchInScope, TokenExpectedException
 from jaclang.parser.variable.assignment import VariableData, GlobalVariableData
 
 
 class VariableBranch(ValueBranch):
-    def __init__(self, variable_name: str):
+    def __init__(self, variable_name: str, pos: int = -1):
         self.variable_name = variable_name
+        self.pos = pos
 
     def printInfo(self, nested_level: int):
         print('    ' * nested_level, f"var: {self.variable_name}")
 
+    def isLoadable(self) -> bool:
+        return True
+
+    def isSameValue(self, other: ValueBranch) -> bool:
+        return type(other) is VariableBranch and other.variable_name == self.variable_name
+
     def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
-        if self.variable_name not in context.symbols.keys():
-            raise JaclangSyntaxError(-1, f"Variable '{self.variable_name}' not found")
+        return self.generateInstructionsInto(context, Registers.RETURN)
+
+    def generateInstructionsInto(self, context: ScopeContext, register: RegisterParameter) -> list[Instruction]:
+        if self.variable_name not in context.symbols:
+            raise JaclangSyntaxError(self.pos, f"Variable '{self.variable_name}' not found")
         variable_obj = context.symbols[self.variable_name]
         if type(variable_obj) is VariableData:
             return [
-                Instructions.MemRead(Registers.STACK_BASE, variable_obj.pos_on_stack, Registers.RETURN),
+                Instructions.MemRead(Registers.STACK_BASE, variable_obj.pos_on_stack, register),
             ]
         elif type(variable_obj) is GlobalVariableData:
             return [
-                Instructions.MemRead(ValueParameter(variable_obj.pos_in_mem), 0, Registers.RETURN),
+                Instructions.MemRead(ValueParameter(variable_obj.pos_in_mem), 0, register),
             ]
         else:
-            raise JaclangSyntaxError(-1, f"Label '{self.variable_name}' is not a variable")
+            raise JaclangSyntaxError(self.pos, f"Label '{self.variable_name}' is not a variable")
 
 
 class VariableFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
-        if type(tokens[pos]) is not IdentifierToken:
-            raise TokenExpectedException(tokens[pos].pos, "Expected identifier")
-        variable_name = tokens[pos].identifier
+    memoizable = True
+
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {TokenKinds.IDENTIFIER}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
+        if tokens[pos] != TokenKinds.IDENTIFIER:
+            raise TokenExpectedException(tokens.getPos(pos), "Expected identifier")
+        variable_name = tokens.getIdentifier(pos)
+        begin_pos = tokens.getPos(pos)
         pos += 1
-        return pos, VariableBranch(variable_name)
+        return pos, VariableBranch(variable_name, begin_pos)
@@ -1,10 +1,13 @@
-from jaclang.generator import Instruction, Instructions, Registers
+from typing import Optional, Iterator
+
+from jaclang.generator import Instructions
 from jaclang.generator.generator import LabelParameter
-from jaclang.lexer import Token, Keywords
+from jaclang.lexer import TokenStream, Keywords
 from jaclang.parser.expression import ExpressionFactory
 from jaclang.parser.expression.value import ValueBranch
+from jaclang.parser.loop_invariants import LoopOptimizer
 from jaclang.parser.scope import ScopeFactory, BranchInScope, BranchInScopeFactory, ModifierBranchInScope, \
-    TokenExpectedException, ScopeContext
+    TokenExpectedException, ScopeContext, Nested
 
 
 class WhileStatementBranch(ModifierBranchInScope):
@@ -12,36 +15,34 @@ class WhileStatementBranch(ModifierBranchInScope):
         super().__init__()
         self.condition = condition
 
-    def generateInstructions(self, context: ScopeContext) -> list[Instruction]:
+    def generateNestedInstructions(self, context: ScopeContext) -> Iterator:
+        # the condition is checked at the bottom, so an iteration only takes the one jump back to the top
         while_begin = f"while_begin_{context.id_manager.requestId()}"
-        while_begin2 = f"while_begin2_{context.id_manager.requestId()}"
-        while_end = f"while_end_{context.id_manager.requestId()}"
-        instructions = [
-            Instructions.Label(while_begin),
-        ]
-        instructions += self.condition.generateInstructions(context)
-        instructions += [
-            Instructions.Jump(LabelParameter(while_begin2), Registers.RETURN),
-            Instructions.Jump(LabelParameter(while_end), None),
-            Instructions.Label(while_begin2),
-        ]
-        instructions += self.branch.generateInstructions(context)
-        instructions += [
-            Instructions.Jump(LabelParameter(while_begin), None),
-            Instructions.Label(while_end),
-        ]
-        return instructions
-
-    def printInfo(self, nested_level: int):
+        while_condition = f"while_condition_{context.id_manager.requestId()}"
+        loop_optimizer = LoopOptimizer(context, self.condition, self.branch)
+        yield from loop_optimizer.optimize()
+        # generated before the body, as the body may declare names the condition must not see
+        condition = list(self.condition.generateJump(context, while_begin, True))
+        yield Instructions.Jump(LabelParameter(while_condition), None)
+        yield Instructions.Label(while_begin)
+        yield Nested(self.branch.generateNestedInstructions(context))
+        yield Instructions.Label(while_condition)
+        yield from condition
+        loop_optimizer.finish()
+
+    def printNestedInfo(self, nested_level: int) -> Iterator:
         print("    " * nested_level, "WhileStatement:")
         self.condition.printInfo(nested_level + 1)
-        self.branch.printInfo(nested_level + 1)
+        yield Nested(self.branch.printNestedInfo(nested_level + 1))
 
 
 class WhileStatementFactory(BranchInScopeFactory):
-    def parseImpl(self, pos: int, tokens: list[Token]) -> (int, BranchInScope):
+    def getLeadingKinds(self) -> Optional[set[int]]:
+        return {Keywords.WHILE}
+
+    def parseImpl(self, pos: int, tokens: TokenStream) -> (int, BranchInScope):
         if tokens[pos] != Keywords.WHILE:
-            raise TokenExpectedException(tokens[pos].pos, "Expected while keyword")
+            raise TokenExpectedException(tokens.getPos(pos), "Expected while keyword")
         pos += 1
 
         expr_factory = ExpressionFactory()
@@ -1,51 +1,78 @@
+import re
+from typing import Iterator
+
 from jaclang.error.syntax_error import JaclangSyntaxError
 
 PREPROCESSOR_WHITESPACE = " "
+WHITESPACE_TABLE = str.maketrans({"\n": PREPROCESSOR_WHITESPACE, "\t": PREPROCESSOR_WHITESPACE,
+                                  " ": PREPROCESSOR_WHITESPACE, "\r": PREPROCESSOR_WHITESPACE})
+COMMENT_MARKER = re.compile(r"//|/\*|\*/")
 
 
-def removeSingleLineComments(code: str) -> str:
-    new_code = ""
-    is_in_comment = False
-    for i, c in enumerate(code):
-        if i < len(code) - 1 and c == '/' and code[i + 1] == '/':
-            is_in_comment = True
+# splits code into (begin, end, is_comment) spans that cover it entirely
+def commentSpans(code: str) -> Iterator[tuple[int, int, bool]]:
+    span_begin = 0
+    comment_nesting = 0
+    pos = 0
+    while True:
+        match = COMMENT_MARKER.search(code, pos)
+        if match is None:
+            break
+        marker_pos = match.start()
+        marker = match.group()
 
-        if c == '\n':
-            is_in_comment = False
+        if marker == "//":
+            line_end = code.find("\n", marker_pos)
+            if line_end == -1:
+                line_end = len(code)
+            if comment_nesting == 0:
+                yield span_begin, marker_pos, False
+                yield marker_pos, line_end, True
+                span_begin = line_end
+            pos = line_end
+            continue
 
-        new_code += " " if is_in_comment else c
+        if marker == "*/" and code.startswith("//", marker_pos + 1):
+            # the '/' of this "*/" already starts a single line comment
+            pos = marker_pos + 1
+            continue
 
-    return new_code
+        # "*/" only takes effect from the character after it, so in "*/*" the comment opens before it closes
+        if marker == "/*" or code.startswith("/*", marker_pos + 1):
+            open_pos = marker_pos if marker == "/*" else marker_pos + 1
+            comment_nesting += 1
+            if comment_nesting == 1:
+                yield span_begin, open_pos, False
+                span_begin = open_pos
 
+        if marker == "*/" and marker_pos + 2 < len(code):
+            if comment_nesting == 0:
+                raise JaclangSyntaxError(marker_pos, "Closed unopened multiline comment")
+            comment_nesting -= 1
+            if comment_nesting == 0:
+                yield span_begin, marker_pos + 2, True
+                span_begin = marker_pos + 2
 
-def removeMultilineComments(code: str) -> str:
-    new_code = ""
-    comment_nesting = 0
-    for i, c in enumerate(code):
-        if i < len(code) - 1 and c == '/' and code[i + 1] == '*':
-            comment_nesting += 1
+        pos = marker_pos + 1 if marker == "/*" else marker_pos + 2
 
-        if i > 1 and code[i - 2] == '*' and code[i - 1] == '/':
-            if comment_nesting > 0:
-                comment_nesting -= 1
-            else:
-                raise JaclangSyntaxError(i - 2, "Closed unopened multiline comment")
+    yield span_begin, len(code), comment_nesting != 0
 
-        new_code += c if comment_nesting == 0 else " "
 
-    return new_code
+def preprocessChunks(file_contents: str, normalize_whitespace: bool = True) -> Iterator[str]:
+    for begin, end, is_comment in commentSpans(file_contents):
+        if is_comment:
+            yield PREPROCESSOR_WHITESPACE * (end - begin)
+        elif normalize_whitespace:
+            yield file_contents[begin:end].translate(WHITESPACE_TABLE)
+        else:
+            yield file_contents[begin:end]
 
 
 def preprocess(file_contents: str, debug_output: bool = False) -> str:
-    file_contents = removeSingleLineComments(file_contents)
-    file_contents = removeMultilineComments(file_contents)
-
     if debug_output:
         print("Preprocessed code:")
         print("---------------------------------")
-        print(file_contents)
+        print("".join(preprocessChunks(file_contents, False)))
         print("---------------------------------")
 
-    file_contents = file_contents.replace("\n", PREPROCESSOR_WHITESPACE).replace("\t", PREPROCESSOR_WHITESPACE).replace(
-        " ", PREPROCESSOR_WHITESPACE).replace("\r", PREPROCESSOR_WHITESPACE)
-    return file_contents
+    return "".join(preprocessChunks(file_contents))